@@ -1,24 +1,40 @@
 from flask import Flask
 from .extensions import db, migrate, login_manager
 from .admin import init_admin
-from .models import User
 from .cart.utils import cart_len
+from .querycount import init_query_counter
+from .instrumentation import init_instrumentation
+from .cache import response_cache
+from .jsonprovider import init_json
+from .database import configure_database, init_database
+from .identity import init_identity
+from .passwords import password_hasher
+from .images import init_images
+from .fragments import fragment_cache
 
-def create_app():
+def create_app(config_overrides=None):
     app = Flask(__name__)
     app.config.from_object("config.Config")
+    if config_overrides:
+        app.config.update(config_overrides)
+    init_json(app)
 
     # Init extensions
+    configure_database(app)
     db.init_app(app)
+    init_database(app, db)
     migrate.init_app(app, db)
+    init_query_counter(app)
+    init_instrumentation(app)
+    response_cache.init_app(app)
+    password_hasher.init_app(app)
+    init_images(app)
+    fragment_cache.init_app(app)
 
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
     login_manager.login_message_category = "warning"
-
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    init_identity(app, login_manager)
 
     # Blueprints
     from .auth.routes import bp as auth_bp
@@ -26,16 +42,43 @@ def create_app():
     from .cart.routes import bp as cart_bp
     from .orders.routes import bp as orders_bp
     from .api.routes import bp as api_bp
+    from .reports.routes import bp as reports_bp
 
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(catalog_bp)
     app.register_blueprint(cart_bp, url_prefix="/cart")
     app.register_blueprint(orders_bp, url_prefix="/orders")
     app.register_blueprint(api_bp, url_prefix="/api")
+    app.register_blueprint(reports_bp, url_prefix="/api/reports")
 
     # Admin
     init_admin(app)
 
+    # CLI
+    from .search import search_cli
+    from .indexes import indexes_cli
+    from .cart.utils import cart_cli
+    from .orders.utils import orders_cli
+    from .reports.utils import reports_cli
+    from .catalog.bulk import catalog_cli
+    from .slugs import slugs_cli
+    from .bench import bench_cli
+    from .database import replica_cli
+    from .jobs import jobs_cli, worker_command
+    from .images import images_cli
+    app.cli.add_command(search_cli)
+    app.cli.add_command(indexes_cli)
+    app.cli.add_command(cart_cli)
+    app.cli.add_command(orders_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(slugs_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(replica_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(images_cli)
+
     # Template context: cart length
     @app.context_processor
     def inject_globals():
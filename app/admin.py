@@ -1,9 +1,14 @@
-from flask import redirect, url_for, request
+from flask import Response, flash, redirect, url_for, request, stream_with_context
 from flask_login import current_user
-from flask_admin import Admin, AdminIndexView, expose
+from flask_admin import Admin, AdminIndexView, BaseView, expose
+from flask_admin.actions import action
 from flask_admin.contrib.sqla import ModelView
 from .extensions import db
-from .models import User, Category, Product, ProductImage, Order, OrderItem
+from .models import User, Category, Product, ProductImage, Order, OrderItem, DailySales, Job
+from .reports.utils import parse_range, revenue_report, top_products
+from .slugs import add_with_unique_slug
+from .catalog.bulk import FORMATS, export_catalog, import_catalog
+from .jobs import requeue
 
 class MyAdminIndex(AdminIndexView):
     @expose("/")
@@ -22,11 +27,106 @@ class SecureModelView(ModelView):
     def inaccessible_callback(self, name, **kwargs):
         return redirect(url_for("auth.login", next=request.url))
 
+class SlugModelView(SecureModelView):
+    def on_model_change(self, form, model, is_created):
+        if is_created:
+            add_with_unique_slug(self.session, model)
+
+class OrderView(SecureModelView):
+    # Totals are stored columns, so sorting/filtering happens in SQL with no item loads
+    column_list = ("id", "user", "first_name", "last_name", "email", "status",
+                   "item_count", "subtotal", "total", "created_at")
+    column_sortable_list = ("id", "status", "item_count", "subtotal", "total", "created_at")
+    column_filters = ("status", "total", "item_count", "created_at")
+    column_default_sort = ("created_at", True)
+    form_excluded_columns = ("subtotal", "item_count", "total", "items")
+
+class DailySalesView(SecureModelView):
+    # Maintained by app.reports.utils; read-only here
+    can_create = False
+    can_edit = False
+    can_delete = False
+    column_list = ("day", "product", "category", "units", "revenue", "order_count")
+    column_filters = ("day", "product_id", "category_id")
+    column_default_sort = ("day", True)
+
+class JobView(SecureModelView):
+    # Rows are written by enqueue() and the workers; admins can only inspect and requeue
+    can_create = False
+    can_edit = False
+    can_view_details = True
+    column_list = ("id", "name", "status", "attempts", "max_attempts", "run_at", "locked_by",
+                   "created_at", "finished_at")
+    column_details_list = column_list + ("idempotency_key", "payload", "locked_at", "last_error")
+    column_filters = ("name", "status", "run_at", "created_at")
+    column_searchable_list = ("idempotency_key",)
+    column_default_sort = ("id", True)
+
+    @action("requeue", "Requeue", "Run the selected jobs again?")
+    def action_requeue(self, ids):
+        count = requeue([int(i) for i in ids])
+        flash(f"Requeued {count} jobs.", "success")
+
+class SalesReportView(BaseView):
+    @expose("/")
+    def index(self):
+        try:
+            start, end = parse_range(request.args.get("start", ""), request.args.get("end", ""))
+        except ValueError:
+            start, end = parse_range("", "")
+        return self.render(
+            "admin/sales_report.html",
+            report=revenue_report(start, end, "day"),
+            top=top_products(start, end, 10),
+        )
+
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.is_admin
+
+    def inaccessible_callback(self, name, **kwargs):
+        return redirect(url_for("auth.login", next=request.url))
+
+class CatalogTransferView(BaseView):
+    @expose("/", methods=["GET", "POST"])
+    def index(self):
+        if request.method == "POST":
+            upload = request.files.get("file")
+            if not upload or not upload.filename:
+                flash("Choose a CSV or JSONL file.", "error")
+                return redirect(url_for(".index"))
+            fmt = "jsonl" if upload.filename.endswith((".jsonl", ".ndjson")) else "csv"
+            result = import_catalog(upload.stream, fmt)
+            flash(f"Import finished: {result.summary()}.", "error" if result.failed else "success")
+            return self.render("admin/catalog_import.html", errors=result.errors)
+        return self.render("admin/catalog_import.html", errors=[])
+
+    @expose("/export")
+    def export(self):
+        fmt = request.args.get("format", "csv")
+        if fmt not in FORMATS:
+            fmt = "csv"
+        mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        return Response(
+            stream_with_context(export_catalog(fmt)),
+            mimetype=mimetype,
+            headers={"Content-Disposition": f"attachment; filename=catalog.{fmt}"},
+        )
+
+    def is_accessible(self):
+        return current_user.is_authenticated and current_user.is_admin
+
+    def inaccessible_callback(self, name, **kwargs):
+        return redirect(url_for("auth.login", next=request.url))
+
 def init_admin(app):
     admin = Admin(app, name="Shop Admin", template_mode="bootstrap4", index_view=MyAdminIndex())
     admin.add_view(SecureModelView(User, db.session))
-    admin.add_view(SecureModelView(Category, db.session))
-    admin.add_view(SecureModelView(Product, db.session))
+    admin.add_view(SlugModelView(Category, db.session))
+    admin.add_view(SlugModelView(Product, db.session))
     admin.add_view(SecureModelView(ProductImage, db.session))
-    admin.add_view(SecureModelView(Order, db.session))
-    admin.add_view(SecureModelView(OrderItem, db.session))
\ No newline at end of file
+    admin.add_view(CatalogTransferView(name="Import / Export", endpoint="catalog_transfer"))
+    admin.add_view(OrderView(Order, db.session))
+    admin.add_view(SecureModelView(OrderItem, db.session))
+    admin.add_view(JobView(Job, db.session, name="Jobs"))
+    admin.add_view(DailySalesView(DailySales, db.session, name="Daily Sales", category="Reports"))
+    admin.add_view(SalesReportView(name="Sales Report", endpoint="sales_report", category="Reports"))
\ No newline at end of file
@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import and_, or_
+from ..models import Product
+
+# Keyset pagination for /api/products: each ordering maps to (sort column, descending?).
+# The cursor carries the sort key and id of the last row served; ties are broken on id.
+KEYSET_ORDERINGS = {
+    "name": (Product.name, False),
+    "-name": (Product.name, True),
+    "price": (Product.price, False),
+    "-price": (Product.price, True),
+    "created_at": (Product.created_at, False),
+    "-created_at": (Product.created_at, True),
+}
+DEFAULT_ORDERING = "-created_at"
+
+class InvalidCursor(ValueError):
+    pass
+
+def _dump_key(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _load_key(ordering, value):
+    field = ordering.lstrip("-")
+    try:
+        if field == "created_at":
+            return datetime.fromisoformat(value)
+        if field == "price":
+            return Decimal(value)
+    except (TypeError, ValueError, InvalidOperation) as exc:
+        raise InvalidCursor(str(exc))
+    if not isinstance(value, str):
+        raise InvalidCursor("bad key")
+    return value
+
+def encode_cursor(ordering, product):
+    column, _ = KEYSET_ORDERINGS[ordering]
+    payload = {"o": ordering, "k": _dump_key(getattr(product, column.key)), "id": product.id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, ordering):
+    """Return (key, id) from an opaque cursor; raises InvalidCursor on tampering or ordering mismatch."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["o"] != ordering:
+            raise InvalidCursor("cursor does not match ordering")
+        return _load_key(ordering, payload["k"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor(str(exc))
+
+def apply_keyset(query, ordering, cursor):
+    """Order ``query`` for keyset paging and, given a cursor, seek past its position."""
+    column, descending = KEYSET_ORDERINGS[ordering]
+    if cursor:
+        key, last_id = decode_cursor(cursor, ordering)
+        if descending:
+            query = query.filter(or_(column < key, and_(column == key, Product.id < last_id)))
+        else:
+            query = query.filter(or_(column > key, and_(column == key, Product.id > last_id)))
+    if descending:
+        return query.order_by(column.desc(), Product.id.desc())
+    return query.order_by(column.asc(), Product.id.asc())
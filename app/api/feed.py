@@ -0,0 +1,41 @@
+import zlib
+from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import select
+from ..extensions import db
+from ..models import Product
+
+# Full-catalog NDJSON feed: one product per line, rows fetched yield_per at a time.
+
+def parse_since(value):
+    """ISO timestamp (naive UTC, like the stored columns) or None. Raises ValueError."""
+    if not value:
+        return None
+    since = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since
+
+def feed_query(since=None):
+    query = (select(Product)
+             .options(*Product.eager(images="selectin", category="joined"))
+             .order_by(Product.updated_at, Product.id))
+    if since is None:
+        return query.where(Product.is_active.is_(True))
+    # Incremental syncs also need deactivated products so mirrors can drop them
+    return query.where(Product.updated_at >= since)
+
+def feed_lines(serialize, since=None, batch_size=500):
+    """Yield NDJSON chunks of ``batch_size`` products each."""
+    dumps = current_app.json.dumps
+    result = db.session.scalars(feed_query(since).execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        yield "".join(dumps(serialize(p)) + "\n" for p in partition).encode()
+
+def gzip_stream(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,100 @@
+from sqlalchemy import select
+from ..extensions import db
+from ..models import Category, Product, ProductImage
+
+# Column-projected product listings: the list endpoints select plain columns and read
+# them as Row tuples, so no ORM instances, identity map or eager loaders are involved.
+FIELDS = ("id", "name", "slug", "description", "price", "stock", "featured", "created_at", "category", "images")
+
+# Always selected: ETags need updated_at, keyset cursors need the sort keys
+_REQUIRED = [Product.id, Product.updated_at, Product.created_at, Product.price, Product.name]
+_OPTIONAL = {
+    "slug": Product.slug,
+    "description": Product.description,
+    "stock": Product.stock,
+    "featured": Product.featured,
+}
+_CATEGORY = [
+    Category.id.label("category_id"),
+    Category.name.label("category_name"),
+    Category.slug.label("category_slug"),
+    Category.parent_id.label("category_parent_id"),
+    Category.updated_at.label("category_updated_at"),
+]
+
+class InvalidFields(ValueError):
+    pass
+
+def parse_fields(value):
+    """``?fields=id,name,price`` -> tuple in canonical order; all fields when empty."""
+    requested = {f.strip() for f in (value or "").split(",") if f.strip()}
+    if not requested:
+        return FIELDS
+    unknown = requested.difference(FIELDS)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in FIELDS if f in requested)
+
+class CategoryRow:
+    __slots__ = ("id", "name", "slug", "parent_id", "updated_at")
+
+    def __init__(self, id, name, slug, parent_id, updated_at):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.updated_at = updated_at
+
+class ProductRow:
+    """Just enough of a Product for serialization, ETags and cursors."""
+    __slots__ = ("_row", "category", "images")
+
+    def __init__(self, row, category, images):
+        self._row = row
+        self.category = category
+        self.images = images
+
+    def __getattr__(self, name):
+        return getattr(self._row, name)
+
+def project(query, fields):
+    """Turn a filtered/ordered ``Product.query`` into a column query for ``fields``."""
+    columns = _REQUIRED + [col for f, col in _OPTIONAL.items() if f in fields]
+    if "category" in fields:
+        return query.outerjoin(Category, Product.category_id == Category.id).with_entities(*columns, *_CATEGORY)
+    return query.with_entities(*columns)
+
+def product_rows(rows, fields):
+    """Wrap projected rows, loading images for all of them with one query."""
+    images = {}
+    if "images" in fields and rows:
+        stmt = (select(ProductImage.product_id, ProductImage.id, ProductImage.image_url,
+                       ProductImage.alt_text, ProductImage.updated_at)
+                .where(ProductImage.product_id.in_([r.id for r in rows]))
+                .order_by(ProductImage.id))
+        for img in db.session.execute(stmt):
+            images.setdefault(img.product_id, []).append(img)
+    out = []
+    for r in rows:
+        category = None
+        if "category" in fields and r.category_id is not None:
+            category = CategoryRow(r.category_id, r.category_name, r.category_slug,
+                                   r.category_parent_id, r.category_updated_at)
+        out.append(ProductRow(r, category, images.get(r.id, [])))
+    return out
+
+def serialize_row(p, fields):
+    data = {}
+    for f in fields:
+        if f == "price":
+            data[f] = float(p.price)
+        elif f == "created_at":
+            data[f] = p.created_at.isoformat()
+        elif f == "category":
+            c = p.category
+            data[f] = {"id": c.id, "name": c.name, "slug": c.slug, "parent_id": c.parent_id} if c else None
+        elif f == "images":
+            data[f] = [{"id": i.id, "image_url": i.image_url, "alt_text": i.alt_text} for i in p.images]
+        else:
+            data[f] = getattr(p, f)
+    return data
@@ -1,8 +1,19 @@
-from flask import Blueprint, request, jsonify, current_app
-from sqlalchemy import or_
-from ..models import Product, Category
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from ..models import Product
+from ..search import apply_search
+from ..categories import get_category_tree
+from ..facets import facet_counts, serialize_facets
+from ..database import use_replica
+from ..cache import cached_response
+from ..conditional import conditional_response, product_validators
+from .projection import InvalidFields, parse_fields, product_rows, project, serialize_row
+from .feed import feed_lines, gzip_stream, parse_since
+from .cursors import KEYSET_ORDERINGS, DEFAULT_ORDERING, InvalidCursor, apply_keyset, encode_cursor
 
 bp = Blueprint("api", __name__)
+# Read-only views: catalog queries may be served by the replica
+bp.before_request(use_replica)
 
 def serialize_product(p: Product):
     return {
@@ -23,22 +34,39 @@ def serialize_product(p: Product):
         "images": [{"id": img.id, "image_url": img.image_url, "alt_text": img.alt_text} for img in p.images],
     }
 
+def with_facets(payload, facets):
+    if facets is not None:
+        payload["facets"] = facets
+    return payload
+
 @bp.get("/products")
+@cached_response()
 def products():
     q = request.args.get("search", "").strip()
     cat = request.args.get("category", "").strip()
     min_price = request.args.get("min_price", "").strip()
     max_price = request.args.get("max_price", "").strip()
+    price_below = request.args.get("price_below", "").strip()
     ordering = request.args.get("ordering", "").strip()
     page = max(1, int(request.args.get("page", 1)))
     per_page = min(max(1, int(request.args.get("per_page", current_app.config.get("ITEMS_PER_PAGE", 12)))), 100)
+    try:
+        fields = parse_fields(request.args.get("fields", ""))
+    except InvalidFields as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # Counts for the same filters, on request (?facets=1)
+    facets = None
+    if request.args.get("facets") in ("1", "true"):
+        facets = serialize_facets(facet_counts(q, cat, min_price, max_price, price_below))
 
-    query = Product.query.filter_by(is_active=True).join(Category)
+    query = Product.query.filter_by(is_active=True)
+    rank = None
     if q:
-        like = f"%{q}%"
-        query = query.filter(or_(Product.name.ilike(like), Product.description.ilike(like)))
+        query, rank = apply_search(query, q)
     if cat:
-        query = query.filter(Category.slug == cat)
+        # Matches the category and all of its descendants
+        query = query.filter(Product.category_id.in_(get_category_tree().ids_for_slug(cat)))
     if min_price:
         try:
             query = query.filter(Product.price >= float(min_price))
@@ -49,6 +77,31 @@ def products():
             query = query.filter(Product.price <= float(max_price))
         except ValueError:
             pass
+    if price_below:
+        # Exclusive upper bound, as used by the price facet links
+        try:
+            query = query.filter(Product.price < float(price_below))
+        except ValueError:
+            pass
+
+    if "cursor" in request.args:
+        # Keyset mode: no OFFSET and no COUNT(*); relevance ordering is not available here
+        if ordering not in KEYSET_ORDERINGS:
+            ordering = DEFAULT_ORDERING
+        try:
+            query = apply_keyset(query, ordering, request.args["cursor"].strip())
+        except InvalidCursor:
+            return jsonify({"error": "Invalid cursor"}), 400
+        rows = project(query, fields).limit(per_page + 1).all()
+        items = product_rows(rows[:per_page], fields)
+        next_cursor = encode_cursor(ordering, items[-1]) if len(rows) > per_page else None
+        etag, last_modified = product_validators(items, next_cursor, fields, facets)
+        return conditional_response(lambda: jsonify(with_facets({
+            "per_page": per_page,
+            "ordering": ordering,
+            "next_cursor": next_cursor,
+            "products": [serialize_row(p, fields) for p in items],
+        }, facets)), etag, last_modified)
 
     ordering_map = {
         "name": Product.name.asc(),
@@ -60,24 +113,57 @@ def products():
     }
     if ordering in ordering_map:
         query = query.order_by(ordering_map[ordering])
+    elif rank is not None:
+        query = query.order_by(rank, Product.id)
     else:
         query = query.order_by(Product.created_at.desc())
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify({
+    pagination = project(query, fields).paginate(page=page, per_page=per_page, error_out=False)
+    items = product_rows(pagination.items, fields)
+    etag, last_modified = product_validators(items, pagination.total, page, per_page, fields, facets)
+    return conditional_response(lambda: jsonify(with_facets({
         "page": page,
         "per_page": per_page,
         "total": pagination.total,
-        "products": [serialize_product(p) for p in pagination.items],
-    })
+        "products": [serialize_row(p, fields) for p in items],
+    }, facets)), etag, last_modified)
+
+def serialize_feed_product(p: Product):
+    data = serialize_product(p)
+    data["is_active"] = p.is_active
+    data["updated_at"] = p.updated_at.isoformat() if p.updated_at else None
+    return data
+
+@bp.get("/products/feed")
+def products_feed():
+    """Whole catalog as streamed NDJSON; ``updated_since`` for incremental syncs."""
+    try:
+        since = parse_since(request.args.get("updated_since", "").strip())
+    except ValueError:
+        return jsonify({"error": "Invalid updated_since"}), 400
+    # Clients pass this back as updated_since next time; taken before the query so nothing is missed
+    started = datetime.utcnow().isoformat()
+    chunks = feed_lines(serialize_feed_product, since, current_app.config.get("FEED_BATCH_SIZE", 500))
+    headers = {"X-Feed-Timestamp": started, "Vary": "Accept-Encoding", "Cache-Control": "no-store"}
+    if "gzip" in request.accept_encodings:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(chunks), mimetype="application/x-ndjson", headers=headers)
 
 @bp.get("/products/<id_or_slug>")
+@cached_response()
 def product_detail(id_or_slug):
+    try:
+        fields = parse_fields(request.args.get("fields", ""))
+    except InvalidFields as exc:
+        return jsonify({"error": str(exc)}), 400
     product = None
+    query = Product.query.options(*Product.eager())
     if id_or_slug.isdigit():
-        product = Product.query.filter_by(id=int(id_or_slug), is_active=True).first()
+        product = query.filter_by(id=int(id_or_slug), is_active=True).first()
     if not product:
-        product = Product.query.filter_by(slug=id_or_slug, is_active=True).first()
+        product = query.filter_by(slug=id_or_slug, is_active=True).first()
     if not product:
         return jsonify({"error": "Not found"}), 404
-    return jsonify(serialize_product(product))
\ No newline at end of file
+    etag, last_modified = product_validators(product, fields)
+    return conditional_response(lambda: jsonify(serialize_row(product, fields)), etag, last_modified)
\ No newline at end of file
@@ -3,9 +3,14 @@ from flask_login import login_user, logout_user, login_required, current_user
 from ..forms import RegisterForm, LoginForm
 from ..extensions import db
 from ..models import User
+from ..passwords import HashingBusy
 
 bp = Blueprint("auth", __name__, template_folder="../templates/auth")
 
+def _busy(template, form):
+    flash("We're handling a lot of sign-ins right now. Please try again in a moment.", "warning")
+    return render_template(template, form=form), 503, {"Retry-After": "1"}
+
 @bp.route("/register", methods=["GET", "POST"])
 def register():
     if current_user.is_authenticated:
@@ -16,7 +21,10 @@ def register():
             flash("Username or email already exists.", "danger")
         else:
             user = User(username=form.username.data, email=form.email.data)
-            user.set_password(form.password.data)
+            try:
+                user.set_password(form.password.data)
+            except HashingBusy:
+                return _busy("auth/register.html", form)
             db.session.add(user)
             db.session.commit()
             login_user(user)
@@ -31,7 +39,18 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except HashingBusy:
+            return _busy("auth/login.html", form)
+        if valid and user.password_needs_rehash():
+            # Stored with an older algorithm or cost; upgrade while we have the password
+            try:
+                user.set_password(form.password.data)
+                db.session.commit()
+            except HashingBusy:
+                pass  # keep the old hash; a later login upgrades it
+        if valid:
             login_user(user, remember=form.remember.data)
             flash("Logged in successfully.", "success")
             next_url = request.args.get("next")
@@ -0,0 +1,508 @@
+import json
+import os
+import platform
+import random
+import resource
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+import click
+import sqlalchemy
+from flask.cli import AppGroup
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler, make_server
+from .extensions import db
+from .passwords import password_hasher
+
+# Benchmarks for the catalog, API, cart and checkout hot paths.
+# `flask bench run` seeds a synthetic catalog into a throwaway database, drives each
+# scenario through the test client (or real HTTP with --threads) and writes latency
+# percentiles, queries per request and RSS as JSON; `flask bench compare` diffs two runs.
+WORDS = ("cotton shirt linen dress denim jacket wool scarf leather boots silk tie canvas bag "
+         "novel atlas cookbook poetry thriller journal ceramic mug brass lamp oak table").split()
+PASSWORD = "bench-password"
+
+# Seeding ---------------------------------------------------------------------
+
+def seed(products=2000, categories=30, images=2, users=50, orders=500, seed_value=42, batch=5000):
+    """Fill the current app's (empty) database with a synthetic catalog; returns counts."""
+    from .models import Category, Order, OrderItem, Product, ProductImage, User
+    from .search import rebuild_index, fts_enabled
+    from .reports.utils import rebuild_rollup
+
+    rng = random.Random(seed_value)
+    db.create_all()
+    if db.session.scalar(select(func.count(Product.id))):
+        raise click.ClickException("Refusing to seed: the database already has products.")
+
+    roots = max(1, categories // 5)
+    cats = []
+    for i in range(categories):
+        parent = rng.choice(cats) if i >= roots else None
+        cats.append(Category(name=f"{rng.choice(WORDS).title()} {i}", parent=parent))
+    db.session.add_all(cats)
+    db.session.commit()
+    cat_ids = [c.id for c in cats]
+
+    now = datetime.utcnow()
+    rows = []
+    for i in range(products):
+        a, b = rng.sample(WORDS, 2)
+        rows.append({
+            "category_id": rng.choice(cat_ids),
+            "name": f"{a.title()} {b} {i}",
+            "slug": f"{a}-{b}-{i}",
+            "description": " ".join(rng.choices(WORDS, k=12)),
+            "price": round(rng.uniform(1, 500), 2),
+            "stock": 0 if rng.random() < 0.1 else rng.randint(50, 500),
+            "is_active": rng.random() > 0.02,
+            "featured": rng.random() < 0.05,
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now,
+        })
+    for i in range(0, len(rows), batch):
+        db.session.execute(insert(Product), rows[i:i + batch])
+    product_ids = db.session.scalars(select(Product.id).order_by(Product.id)).all()
+    image_rows = [
+        {"product_id": pid, "image_url": f"/static/bench/{pid}-{n}.jpg", "alt_text": "", "updated_at": now}
+        for pid in product_ids for n in range(images)
+    ]
+    for i in range(0, len(image_rows), batch):
+        db.session.execute(insert(ProductImage), image_rows[i:i + batch])
+
+    # One hash for everyone: hashing per user would dominate the seed time
+    password_hash = generate_password_hash(PASSWORD, password_hasher.method)
+    db.session.execute(insert(User), [
+        {"username": f"bench{i}", "email": f"bench{i}@example.com", "password_hash": password_hash, "is_admin": False}
+        for i in range(users)
+    ])
+    user_ids = db.session.scalars(select(User.id).order_by(User.id)).all()
+    prices = dict(db.session.execute(select(Product.id, Product.price)).all())
+
+    for start in range(0, orders, batch):
+        order_rows, lines = [], []
+        for _ in range(min(batch, orders - start)):
+            items = [(pid, rng.randint(1, 3)) for pid in rng.sample(product_ids, min(len(product_ids), rng.randint(1, 4)))]
+            subtotal = sum(prices[pid] * qty for pid, qty in items)
+            order_rows.append({
+                "user_id": rng.choice(user_ids), "first_name": "Bench", "last_name": "User",
+                "email": "bench@example.com", "address": "1 Bench St", "city": "Bench", "postal_code": "00000",
+                "status": rng.choice(("pending", "processing", "shipped", "delivered", "cancelled")),
+                "created_at": now - timedelta(hours=rng.randint(0, 24 * 90)),
+                "subtotal": subtotal, "item_count": sum(q for _, q in items), "total": subtotal,
+            })
+            lines.append(items)
+        order_ids = db.session.scalars(
+            insert(Order).returning(Order.id, sort_by_parameter_order=True), order_rows
+        ).all()
+        db.session.execute(insert(OrderItem), [
+            {"order_id": oid, "product_id": pid, "quantity": qty, "price": prices[pid]}
+            for oid, items in zip(order_ids, lines) for pid, qty in items
+        ])
+    rebuild_rollup(db.session.connection())
+    db.session.commit()
+    if fts_enabled():
+        rebuild_index()
+    return {"categories": categories, "products": products, "images": len(image_rows),
+            "users": users, "orders": orders}
+
+# Drivers: the same scenarios run against the test client or a real HTTP server -------
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None):
+        response = self.client.open(path, method=method, data=data)
+        return response.status_code, response.headers.get("X-Query-Count")
+
+class HTTPDriver:
+    class _NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()), self._NoRedirect())
+
+    def request(self, method, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, method=method)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status, response.headers.get("X-Query-Count")
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, exc.headers.get("X-Query-Count")
+
+# Scenarios: (setup(driver, ctx) or None, step(driver, ctx, rng) -> (status, query count)) ----
+
+def _login(driver, ctx):
+    driver.request("POST", "/auth/login", {"username": "bench0", "password": PASSWORD})
+
+def _fill_cart(driver, ctx):
+    for pid in ctx["in_stock"][:3]:
+        driver.request("POST", "/cart/add", {"product_id": pid, "quantity": 1})
+
+def _checkout(driver, ctx, rng):
+    # Timed as one step: refilling the cart is part of every checkout
+    driver.request("POST", "/cart/add", {"product_id": rng.choice(ctx["in_stock"]), "quantity": 1})
+    return driver.request("POST", "/orders/checkout", {
+        "first_name": "Bench", "last_name": "User", "email": "bench@example.com",
+        "address": "1 Bench St", "city": "Bench", "postal_code": "00000",
+    })
+
+SCENARIOS = {
+    "home": (None, lambda d, c, r: d.request("GET", "/")),
+    "product_list": (None, lambda d, c, r: d.request("GET", f"/products?page={r.randint(1, 5)}")),
+    "product_list_filtered": (None, lambda d, c, r: d.request(
+        "GET", f"/products?category={r.choice(c['categories'])}&min_price=10&max_price=250&sort=price_asc")),
+    "product_search": (None, lambda d, c, r: d.request("GET", f"/products?q={r.choice(WORDS)}")),
+    "product_detail": (None, lambda d, c, r: d.request("GET", f"/products/{r.choice(c['slugs'])}")),
+    "api_products": (None, lambda d, c, r: d.request("GET", f"/api/products?per_page=50&page={r.randint(1, 5)}")),
+    "api_products_fields": (None, lambda d, c, r: d.request("GET", "/api/products?per_page=50&fields=id,name,price")),
+    "api_products_cursor": (None, lambda d, c, r: d.request("GET", "/api/products?per_page=50&cursor=")),
+    "api_products_facets": (None, lambda d, c, r: d.request("GET", f"/api/products?facets=1&q={r.choice(WORDS)}")),
+    "api_product_detail": (None, lambda d, c, r: d.request("GET", f"/api/products/{r.choice(c['ids'])}")),
+    "cart_add": (None, lambda d, c, r: d.request("POST", "/cart/add", {"product_id": r.choice(c["in_stock"]), "quantity": 1})),
+    "cart_view": (_fill_cart, lambda d, c, r: d.request("GET", "/cart/")),
+    "checkout": (_login, _checkout),
+}
+
+def _context(seed_value):
+    from .models import Category, Product
+    rng = random.Random(seed_value)
+    active = db.session.execute(select(Product.id, Product.slug, Product.stock).where(Product.is_active.is_(True))).all()
+    sample = rng.sample(active, min(len(active), 500))
+    return {
+        "ids": [r.id for r in sample],
+        "slugs": [r.slug for r in sample],
+        "in_stock": [r.id for r in sample if r.stock > 0],
+        "categories": db.session.scalars(select(Category.slug)).all(),
+    }
+
+# Measurement -----------------------------------------------------------------
+
+def rss_mb():
+    """Current resident set size (peak on platforms without /proc)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if platform.system() == "Darwin" else peak / 1024
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "p99_ms": round(_percentile(latencies, 99), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+        "rss_mb": round(rss_mb(), 1),
+    }
+
+def _drive(driver, ctx, scenario, iterations, rng, out):
+    setup, step = SCENARIOS[scenario]
+    if setup is not None:
+        setup(driver, ctx)
+    for _ in range(iterations):
+        started = time.perf_counter()
+        status, queries = step(driver, ctx, rng)
+        out["latencies"].append((time.perf_counter() - started) * 1000)
+        if queries is not None:
+            out["queries"].append(int(queries))
+        if status >= 400:
+            out["errors"] += 1
+
+def run_scenario(app, ctx, scenario, iterations, warmup, threads, base_url, seed_value):
+    make_driver = (lambda: HTTPDriver(base_url)) if threads else (lambda: TestClientDriver(app))
+    _drive(make_driver(), ctx, scenario, warmup, random.Random(seed_value), {"latencies": [], "queries": [], "errors": 0})
+    results = [{"latencies": [], "queries": [], "errors": 0} for _ in range(max(threads, 1))]
+    started = time.perf_counter()
+    if not threads:
+        _drive(make_driver(), ctx, scenario, iterations, random.Random(seed_value), results[0])
+    else:
+        per_thread = max(1, iterations // threads)
+        workers = [
+            threading.Thread(target=_drive, args=(make_driver(), ctx, scenario, per_thread,
+                                                   random.Random(seed_value + n), results[n]))
+            for n in range(threads)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    elapsed = time.perf_counter() - started
+    return summarize(
+        [x for r in results for x in r["latencies"]],
+        [x for r in results for x in r["queries"]],
+        sum(r["errors"] for r in results),
+        elapsed,
+    )
+
+def compare(baseline, current, tolerance=0.10):
+    """Rows of (scenario, metric, before, after, change) plus the regressions among them."""
+    rows, regressions = [], []
+    for key in ("mode", "database", "cache", "seed"):
+        if baseline.get("meta", {}).get(key) != current.get("meta", {}).get(key):
+            click.echo(f"warning: runs differ in {key}; numbers are not comparable", err=True)
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "queries_per_request"):
+            a, b = before.get(metric), now.get(metric)
+            if a is None or b is None:
+                continue
+            change = (b - a) / a if a else (0.0 if b == a else float("inf"))
+            row = (name, metric, a, b, change)
+            rows.append(row)
+            # Query counts are averages over random pages; half a query per request is real
+            worse = b - a >= 0.5 if metric == "queries_per_request" else change > tolerance
+            if worse:
+                regressions.append(row)
+    return rows, regressions
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+def _print_comparison(rows, regressions):
+    for name, metric, a, b, change in rows:
+        flag = "  <-- regression" if (name, metric, a, b, change) in regressions else ""
+        click.echo(f"{name:24} {metric:20} {a:>10} -> {b:<10} {change:+.1%}{flag}")
+
+bench_cli = AppGroup("bench", help="Benchmark the hot paths against a synthetic catalog.")
+
+@bench_cli.command("run")
+@click.option("--database-url", help="Empty database to seed (default: throwaway SQLite file).")
+@click.option("--products", default=2000, show_default=True)
+@click.option("--categories", default=30, show_default=True)
+@click.option("--images", default=2, show_default=True, help="Images per product.")
+@click.option("--users", default=50, show_default=True)
+@click.option("--orders", default=500, show_default=True)
+@click.option("--iterations", default=200, show_default=True, help="Measured requests per scenario.")
+@click.option("--warmup", default=20, show_default=True)
+@click.option("--threads", default=0, show_default=True, help="Drive a threaded WSGI server over HTTP with N clients.")
+@click.option("--scenario", "scenarios", multiple=True, type=click.Choice(list(SCENARIOS)), help="Default: all.")
+@click.option("--cache/--no-cache", default=False, show_default=True, help="Response cache on or off.")
+@click.option("--seed", "seed_value", default=42, show_default=True)
+@click.option("-o", "--output", help="Write the JSON results here (default: stdout).")
+@click.option("--baseline", type=click.Path(exists=True), help="Compare against a previous --output file.")
+@click.option("--tolerance", default=0.10, show_default=True, help="Allowed latency increase vs. the baseline.")
+def run_command(database_url, products, categories, images, users, orders, iterations, warmup,
+                threads, scenarios, cache, seed_value, output, baseline, tolerance):
+    """Seed a synthetic catalog and benchmark the selected scenarios."""
+    from . import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": url,
+            "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": max(threads, 5), "connect_args": {"timeout": 30}}
+            if url.startswith("sqlite") else {},
+            "WTF_CSRF_ENABLED": False,
+            "QUERY_COUNT_HEADER": True,
+            "RESPONSE_CACHE_ENABLED": cache,
+        })
+        with app.app_context():
+            started = time.perf_counter()
+            counts = seed(products, categories, images, users, orders, seed_value)
+            click.echo(f"Seeded {counts} in {time.perf_counter() - started:.1f}s", err=True)
+            ctx = _context(seed_value)
+            db.session.remove()
+
+        server = base_url = None
+        if threads:
+            server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+
+        results = {}
+        try:
+            for name in scenarios or SCENARIOS:
+                results[name] = run_scenario(app, ctx, name, iterations, warmup, threads, base_url, seed_value)
+                r = results[name]
+                click.echo(f"{name:24} p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+                           f"p99 {r['p99_ms']:8.2f} ms  q/req {r['queries_per_request']}  "
+                           f"errors {r['errors']}", err=True)
+        finally:
+            if server is not None:
+                server.shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": url.split(":", 1)[0],
+            "mode": f"http x{threads}" if threads else "test_client",
+            "cache": cache,
+            "iterations": iterations,
+            "seed": {**counts, "seed": seed_value},
+        },
+        "scenarios": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        click.echo(text)
+    if baseline:
+        with open(baseline) as f:
+            rows, regressions = compare(json.load(f), report, tolerance)
+        _print_comparison(rows, regressions)
+        if regressions:
+            raise SystemExit(1)
+
+def _drive_until(step, deadline, rng, out, expected):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        status, queries = step(rng)
+        out["latencies"].append((time.perf_counter() - started) * 1000)
+        if queries is not None:
+            out["queries"].append(int(queries))
+        if status == 503:
+            out["busy"] += 1
+        elif status != expected:
+            out["errors"] += 1
+
+@bench_cli.command("logins")
+@click.option("--database-url", help="Empty database to seed (default: throwaway SQLite file).")
+@click.option("--products", default=2000, show_default=True)
+@click.option("--users", default=50, show_default=True)
+@click.option("--login-threads", default=8, show_default=True, help="Clients posting /auth/login.")
+@click.option("--catalog-threads", default=4, show_default=True, help="Clients browsing /products meanwhile.")
+@click.option("--duration", default=10.0, show_default=True, help="Seconds to run.")
+@click.option("--hash-workers", type=int, help="PASSWORD_HASH_WORKERS for this run (0 = hash inline).")
+@click.option("--seed", "seed_value", default=42, show_default=True)
+@click.option("-o", "--output", help="Write the JSON results here (default: stdout).")
+def logins_command(database_url, products, users, login_threads, catalog_threads, duration,
+                   hash_workers, seed_value, output):
+    """Login throughput and catalog latency with both running against one threaded server."""
+    from . import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        overrides = {
+            "SQLALCHEMY_DATABASE_URI": url,
+            "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": login_threads + catalog_threads + 5,
+                                          "connect_args": {"timeout": 30}} if url.startswith("sqlite") else {},
+            "WTF_CSRF_ENABLED": False,
+            "QUERY_COUNT_HEADER": True,
+            "RESPONSE_CACHE_ENABLED": False,
+        }
+        if hash_workers is not None:
+            overrides["PASSWORD_HASH_WORKERS"] = hash_workers
+        app = create_app(overrides)
+        with app.app_context():
+            counts = seed(products, users=users, orders=0, seed_value=seed_value)
+            ctx = _context(seed_value)
+            db.session.remove()
+
+        server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=_QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        def login(rng):
+            # Success is the 302 to the home page (a 200 is the form again); a fresh cookie
+            # jar per attempt, or every login after the first would just redirect
+            return HTTPDriver(base_url).request(
+                "POST", "/auth/login", {"username": f"bench{rng.randrange(users)}", "password": PASSWORD})
+
+        def browse(driver):
+            def step(rng):
+                if rng.random() < 0.5:
+                    return driver.request("GET", f"/products?page={rng.randint(1, 5)}")
+                return driver.request("GET", f"/products/{rng.choice(ctx['slugs'])}")
+            return step
+
+        # One warm-up login starts the hashing pool outside the measured window
+        login(random.Random(seed_value))
+        logins = [{"latencies": [], "queries": [], "errors": 0, "busy": 0} for _ in range(login_threads)]
+        browsing = [{"latencies": [], "queries": [], "errors": 0, "busy": 0} for _ in range(catalog_threads)]
+        deadline = time.perf_counter() + duration
+        threads = (
+            [threading.Thread(target=_drive_until, args=(login, deadline, random.Random(seed_value + n), out, 302))
+             for n, out in enumerate(logins)]
+            + [threading.Thread(target=_drive_until, args=(browse(HTTPDriver(base_url)), deadline,
+                                                           random.Random(seed_value - n - 1), out, 200))
+               for n, out in enumerate(browsing)]
+        )
+        started = time.perf_counter()
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            elapsed = time.perf_counter() - started
+            server.shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+    results = {}
+    for name, outs in (("login", logins), ("catalog", browsing)):
+        results[name] = summarize([x for o in outs for x in o["latencies"]], [x for o in outs for x in o["queries"]],
+                                  sum(o["errors"] for o in outs), elapsed)
+        results[name]["busy"] = sum(o["busy"] for o in outs)
+        r = results[name]
+        click.echo(f"{name:8} {r['rps']:7.1f} req/s  p50 {r['p50_ms']:8.2f} ms  p95 {r['p95_ms']:8.2f} ms  "
+                   f"p99 {r['p99_ms']:8.2f} ms  busy {r['busy']}  errors {r['errors']}", err=True)
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "database": url.split(":", 1)[0],
+            "hash_method": app.config["PASSWORD_HASH_METHOD"],
+            "hash_workers": app.config["PASSWORD_HASH_WORKERS"],
+            "cpus": os.cpu_count(),
+            "login_threads": login_threads,
+            "catalog_threads": catalog_threads,
+            "duration": duration,
+            "seed": {**counts, "seed": seed_value},
+        },
+        "scenarios": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        click.echo(text)
+
+@bench_cli.command("compare")
+@click.argument("baseline", type=click.Path(exists=True))
+@click.argument("current", type=click.Path(exists=True))
+@click.option("--tolerance", default=0.10, show_default=True)
+def compare_command(baseline, current, tolerance):
+    """Diff two `bench run` outputs; exits 1 on latency or query-count regressions."""
+    with open(baseline) as a, open(current) as b:
+        rows, regressions = compare(json.load(a), json.load(b), tolerance)
+    _print_comparison(rows, regressions)
+    if regressions:
+        raise SystemExit(1)
@@ -0,0 +1,288 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from .models import Category, Product, ProductImage
+from .cart.utils import cart_len
+
+# Backends -----------------------------------------------------------------
+
+class CacheBackend:
+    """Minimal interface shared by the cache backends (a subset of the Redis API)."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def counter(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+class LRUCache(CacheBackend):
+    """Thread-safe in-process LRU with per-entry TTL. Counters are never evicted."""
+
+    def __init__(self, maxsize=1024, default_ttl=60):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._counters.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class RedisCache(CacheBackend):
+    """Backend for any client exposing redis-py's get/set(ex=)/delete/incr/flushdb."""
+
+    def __init__(self, client, default_ttl=60, prefix="shop:"):
+        self.client = client
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def counter(self, key):
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def clear(self):
+        self.client.flushdb()
+
+class FakeRedis:
+    """In-memory stand-in for a redis-py client, for tests and local runs without Redis."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry and entry[0] is not None and entry[0] < time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return entry[1] if entry else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(1 for k in keys if self._data.pop(k, None) is not None)
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._live(key)
+            value = int(entry[1]) + 1 if entry else 1
+            self._data[key] = (entry[0] if entry else None, str(value).encode())
+            return value
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+        return True
+
+def make_backend(config):
+    kind = config.get("CACHE_BACKEND", "lru")
+    ttl = config.get("CACHE_DEFAULT_TTL", 60)
+    if kind == "lru":
+        return LRUCache(maxsize=config.get("CACHE_MAXSIZE", 1024), default_ttl=ttl)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("CACHE_BACKEND='redis' requires the 'redis' package.") from exc
+        return RedisCache(redis.Redis.from_url(config["CACHE_REDIS_URL"]), default_ttl=ttl)
+    if kind == "fakeredis":
+        return RedisCache(FakeRedis(), default_ttl=ttl)
+    if kind == "null":
+        return NullCache()
+    raise ValueError(f"Unknown CACHE_BACKEND: {kind!r}")
+
+# Response cache -----------------------------------------------------------
+
+GENERATION_KEY = "catalog:generation"
+
+class ResponseCache:
+    """Caches full GET responses keyed on endpoint, view args and normalized query args.
+
+    Keys embed a catalog generation counter; any committed write to Product,
+    Category or ProductImage bumps it, so every cached page is dropped at once.
+    """
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        self._invalidate_callbacks = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        app.extensions["response_cache"] = self
+
+    def generation(self):
+        return self.backend.counter(GENERATION_KEY)
+
+    def invalidate(self):
+        self.backend.incr(GENERATION_KEY)
+        for callback in self._invalidate_callbacks:
+            callback()
+
+    def on_invalidate(self, callback):
+        """Call ``callback()`` in this process whenever the catalog generation is bumped."""
+        self._invalidate_callbacks.append(callback)
+
+    def make_key(self):
+        args = sorted(
+            (k, v.strip()) for k, vs in request.args.lists() for v in vs if v.strip()
+        )
+        view_args = sorted((request.view_args or {}).items())
+        return f"resp:{self.generation()}:{request.endpoint}:{view_args!r}:{args!r}"
+
+response_cache = ResponseCache()
+
+CACHED_HEADERS = {"Content-Type", "ETag", "Last-Modified", "Cache-Control", "Vary"}
+
+def is_personalized():
+    """True when the page would differ from what an anonymous, empty-cart visitor sees."""
+    return bool(current_user.is_authenticated or session.get("_flashes") or cart_len())
+
+def cached_response(ttl=None, anonymous_only=False):
+    """Serve GET responses from ``response_cache``; HTML pages pass anonymous_only=True."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (request.method != "GET" or not current_app.config.get("RESPONSE_CACHE_ENABLED", True)
+                    or (anonymous_only and is_personalized())):
+                return view(*args, **kwargs)
+            key = response_cache.make_key()
+            hit = response_cache.backend.get(key)
+            if hit is not None:
+                body, status, headers = hit
+                response = current_app.response_class(body, status=status, headers=headers)
+                response.headers["X-Cache"] = "HIT"
+                # Validators were stored with the entry, so 304s need no view call either
+                return response.make_conditional(request)
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(k, v) for k, v in response.headers.items() if k in CACHED_HEADERS]
+                response_cache.backend.set(key, (response.get_data(), response.status_code, headers), ttl)
+                response.headers["X-Cache"] = "MISS"
+            return response
+        return wrapper
+    return decorator
+
+# Invalidation: flag the session on catalog writes, bump the generation once it commits
+_DIRTY = "response_cache_dirty"
+
+def mark_catalog_dirty(sess):
+    """Invalidate cached responses when ``sess`` commits; for Core/bulk writes that skip mapper events."""
+    sess.info[_DIRTY] = True
+
+def _mark_dirty(mapper, connection, target):
+    sess = object_session(target)
+    if sess is not None:
+        mark_catalog_dirty(sess)
+
+for _model in (Product, Category, ProductImage):
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _evt, _mark_dirty)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(sess):
+    if sess.info.pop(_DIRTY, False):
+        response_cache.invalidate()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(sess):
+    sess.info.pop(_DIRTY, None)
@@ -1,60 +1,182 @@
+import secrets
+from datetime import datetime, timedelta
 from decimal import Decimal
-from flask import session
-from ..models import Product
+import click
+from flask import g, session, has_request_context
+from flask.cli import AppGroup
+from flask_login import current_user, user_logged_in
+from ..models import Cart, CartItem, Product
 from ..extensions import db
 
-CART_KEY = "cart"
+# Carts live in the database. Logged-in users own one cart; anonymous visitors get a
+# cart keyed by a random token, which is the only cart state kept in the cookie.
+CART_TOKEN_KEY = "cart_token"
+LEGACY_CART_KEY = "cart"  # pre-server-side cookie carts, imported on first access
 
-def _ensure_cart():
-    if CART_KEY not in session:
-        session[CART_KEY] = {}
-    return session[CART_KEY]
+def _lookup_cart():
+    if current_user.is_authenticated:
+        return Cart.query.filter_by(user_id=current_user.id).first()
+    token = session.get(CART_TOKEN_KEY)
+    if token:
+        return Cart.query.filter_by(token=token).first()
+    return None
+
+def _get_cart(create=False):
+    """The current visitor's cart, memoized on ``g``; created on demand."""
+    if "cart" not in g:
+        g.cart = _lookup_cart()
+    if g.cart is None and (create or session.get(LEGACY_CART_KEY)):
+        if current_user.is_authenticated:
+            g.cart = Cart(user_id=current_user.id, item_count=0)
+        else:
+            g.cart = Cart(token=secrets.token_urlsafe(32), item_count=0)
+            session[CART_TOKEN_KEY] = g.cart.token
+        db.session.add(g.cart)
+        _import_legacy_cart(g.cart)
+        db.session.commit()
+    return g.cart
+
+def _import_legacy_cart(cart):
+    legacy = session.pop(LEGACY_CART_KEY, None) or {}
+    for pid, line in legacy.items():
+        try:
+            _add_line(cart, int(pid), max(1, int(line["quantity"])))
+        except (KeyError, TypeError, ValueError):
+            continue
+
+def _find_line(cart, product_id):
+    for line in cart.items:
+        if line.product_id == product_id:
+            return line
+    return None
+
+def _add_line(cart, product_id, quantity, update=False):
+    line = _find_line(cart, product_id)
+    if line is None:
+        line = CartItem(product_id=product_id, quantity=0)
+        cart.items.append(line)
+    line.quantity = quantity if update else line.quantity + quantity
+    _recount(cart)
+
+def _recount(cart):
+    cart.item_count = sum(line.quantity for line in cart.items)
+    cart.updated_at = datetime.utcnow()
+    _invalidate_snapshot()
 
 def add_to_cart(product_id: int, quantity: int, update=False):
-    cart = _ensure_cart()
-    pid = str(product_id)
-    if pid not in cart:
-        cart[pid] = {"quantity": 0}
-    if update:
-        cart[pid]["quantity"] = max(1, int(quantity))
-    else:
-        cart[pid]["quantity"] += max(1, int(quantity))
-    session.modified = True
+    cart = _get_cart(create=True)
+    _add_line(cart, int(product_id), max(1, int(quantity)), update=update)
+    db.session.commit()
 
 def remove_from_cart(product_id: int):
-    cart = _ensure_cart()
-    pid = str(product_id)
-    if pid in cart:
-        del cart[pid]
-    session.modified = True
+    cart = _get_cart()
+    if cart is None:
+        return
+    line = _find_line(cart, int(product_id))
+    if line is not None:
+        cart.items.remove(line)
+        _recount(cart)
+        db.session.commit()
 
 def clear_cart():
-    session[CART_KEY] = {}
-    session.modified = True
+    cart = _get_cart()
+    if cart is None:
+        return
+    cart.items.clear()
+    _recount(cart)
+    db.session.commit()
+
+class CartSnapshot:
+    """Lines, total and count of the current cart, computed in one query and one pass."""
+
+    def __init__(self, cart):
+        self.items = []
+        self.total = Decimal("0.00")
+        self.count = 0
+        if cart is None or not cart.item_count:
+            return
+        rows = (db.session.query(CartItem.id, CartItem.quantity, Product)
+                .outerjoin(Product, CartItem.product_id == Product.id)
+                .filter(CartItem.cart_id == cart.id)
+                .order_by(CartItem.id).all())
+        missing = []
+        for line_id, qty, p in rows:
+            if p is None:
+                missing.append(line_id)
+                continue
+            price = Decimal(p.price)
+            line_total = price * qty
+            self.items.append({
+                "product": p,
+                "quantity": int(qty),
+                "price": price,
+                "total_price": line_total,
+            })
+            self.total += line_total
+            self.count += int(qty)
+        if missing or cart.item_count != self.count:
+            # Lines whose product is gone: drop them so the cached count stays honest
+            if missing:
+                CartItem.query.filter(CartItem.id.in_(missing)).delete(synchronize_session=False)
+                db.session.expire(cart, ["items"])
+            cart.item_count = self.count
+            db.session.commit()
+
+def cart_snapshot():
+    """Request-scoped CartSnapshot; cart mutators discard it."""
+    if "cart_snapshot" not in g:
+        g.cart_snapshot = CartSnapshot(_get_cart())
+    return g.cart_snapshot
+
+def _invalidate_snapshot():
+    g.pop("cart_snapshot", None)
 
 def cart_items():
-    cart = _ensure_cart()
-    ids = [int(pid) for pid in cart.keys()]
-    if not ids:
-        return []
-    products = Product.query.filter(Product.id.in_(ids)).all()
-    items = []
-    for p in products:
-        qty = int(cart[str(p.id)]["quantity"])
-        items.append({
-            "product": p,
-            "quantity": qty,
-            "price": Decimal(p.price),
-            "total_price": Decimal(p.price) * qty,
-        })
-    return items
+    return cart_snapshot().items
 
 def cart_total():
-    total = Decimal("0.00")
-    for item in cart_items():
-        total += item["total_price"]
-    return total
+    return cart_snapshot().total
 
 def cart_len():
-    cart = _ensure_cart()
-    return sum(int(v["quantity"]) for v in cart.values())
\ No newline at end of file
+    """Item count: from the snapshot if already built, else the cart row's cached column."""
+    if not has_request_context():
+        return 0
+    if "cart_snapshot" in g:
+        return g.cart_snapshot.count
+    cart = _get_cart()
+    return cart.item_count if cart is not None else 0
+
+@user_logged_in.connect
+def merge_anonymous_cart(sender, user, **extra):
+    """Fold the anonymous token cart into the user's cart when they log in."""
+    token = session.pop(CART_TOKEN_KEY, None)
+    g.pop("cart", None)
+    _invalidate_snapshot()
+    anon = Cart.query.filter_by(token=token).first() if token else None
+    if anon is None:
+        return
+    cart = Cart.query.filter_by(user_id=user.id).first()
+    if cart is None:
+        anon.token, anon.user_id = None, user.id
+    else:
+        for line in anon.items:
+            _add_line(cart, line.product_id, line.quantity)
+        db.session.delete(anon)
+    db.session.commit()
+
+def prune_anonymous_carts(days=30):
+    """Delete anonymous carts untouched for ``days``; returns how many were removed."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    stale = Cart.query.filter(Cart.user_id.is_(None), Cart.updated_at < cutoff).all()
+    for cart in stale:
+        db.session.delete(cart)
+    db.session.commit()
+    return len(stale)
+
+cart_cli = AppGroup("cart", help="Cart maintenance commands.")
+
+@cart_cli.command("prune")
+@click.option("--days", default=30, show_default=True, help="Age of the last change.")
+def prune_command(days):
+    """Delete stale anonymous carts."""
+    click.echo(f"Removed {prune_anonymous_carts(days)} carts.")
@@ -0,0 +1,332 @@
+import csv
+import io
+import json
+import sys
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from ..extensions import db
+from ..models import Category, Product, ProductImage
+from ..slugs import slug_allocator
+from ..search import reindex_products
+from ..cache import mark_catalog_dirty
+from ..images import queue_variants
+
+# Streaming catalog import/export (CSV or JSON Lines).
+# Rows upsert by sku, then slug; each chunk is one bulk INSERT, one bulk UPDATE and one commit.
+FIELDS = ["sku", "slug", "name", "description", "price", "stock", "is_active", "featured", "category", "images"]
+FORMATS = ("csv", "jsonl")
+IMAGE_SEPARATOR = "|"
+MAX_REPORTED_ERRORS = 100
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def summary(self):
+        return f"{self.created} created, {self.updated} updated, {self.failed} failed"
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, dict)`` from a binary or text stream without loading it whole."""
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for lineno, line in enumerate(text, 1):
+            if line.strip():
+                try:
+                    yield lineno, json.loads(line)
+                except ValueError:
+                    yield lineno, None
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def clean_row(raw):
+    """Normalize one input record; only non-blank fields are returned. Raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("not a JSON object")
+    row = {}
+    for key in ("sku", "slug", "name", "description", "category"):
+        if not _blank(raw.get(key)):
+            row[key] = str(raw[key]).strip()
+    if not _blank(raw.get("price")):
+        try:
+            row["price"] = Decimal(str(raw["price"]).strip())
+        except InvalidOperation:
+            raise ValueError(f"bad price {raw['price']!r}")
+    if not _blank(raw.get("stock")):
+        try:
+            row["stock"] = int(raw["stock"])
+        except (TypeError, ValueError):
+            raise ValueError(f"bad stock {raw['stock']!r}")
+    for key in ("is_active", "featured"):
+        if not _blank(raw.get(key)):
+            row[key] = _as_bool(raw[key])
+    images = raw.get("images")
+    if isinstance(images, str) and images.strip():
+        row["images"] = [u.strip() for u in images.split(IMAGE_SEPARATOR) if u.strip()]
+    elif isinstance(images, list):
+        row["images"] = [str(u).strip() for u in images if not _blank(u)]
+    if "sku" not in row and "slug" not in row and "name" not in row:
+        raise ValueError("row needs a sku, slug or name")
+    return row
+
+class CatalogImporter:
+    def __init__(self, chunk_size=1000, create_categories=True):
+        self.chunk_size = chunk_size
+        self.create_categories = create_categories
+        self.result = ImportResult()
+        self._load_categories()
+
+    def _load_categories(self):
+        self.categories = {}
+        for cid, name, slug in db.session.execute(select(Category.id, Category.name, Category.slug)):
+            self.categories[slug] = cid
+            self.categories[name.lower()] = cid
+
+    def run(self, stream, fmt):
+        chunk = []
+        for lineno, raw in read_rows(stream, fmt):
+            try:
+                chunk.append((lineno, clean_row(raw)))
+            except ValueError as exc:
+                self.result.error(lineno, str(exc))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+        return self.result
+
+    def _category_id(self, ref):
+        cid = self.categories.get(ref) or self.categories.get(ref.lower())
+        if cid is None:
+            if not self.create_categories:
+                raise ValueError(f"unknown category {ref!r}")
+            category = Category(name=ref)
+            db.session.add(category)
+            db.session.flush()
+            cid = self.categories[category.slug] = self.categories[ref.lower()] = category.id
+        return cid
+
+    def _flush(self, chunk):
+        try:
+            created, updated, errors = self._write(chunk)
+        except IntegrityError:
+            # Someone else took a slug/sku meanwhile; the rollback also drops the cached slug
+            # counters and any categories this chunk created, so look those up again
+            db.session.rollback()
+            self._load_categories()
+            try:
+                created, updated, errors = self._write(chunk)
+            except IntegrityError:
+                db.session.rollback()
+                self._load_categories()
+                created, updated, errors = self._write_rows(chunk)
+        db.session.commit()
+        self.result.created += created
+        self.result.updated += updated
+        for lineno, message in errors:
+            self.result.error(lineno, message)
+
+    def _write_rows(self, chunk):
+        """Fallback for a chunk that keeps conflicting: one savepoint per row, so only the bad rows fail."""
+        created = updated = 0
+        errors = []
+        for lineno, row in chunk:
+            try:
+                with db.session.begin_nested():
+                    c, u, e = self._write([(lineno, row)])
+            except IntegrityError as exc:
+                self._load_categories()
+                errors.append((lineno, f"rejected: {exc.orig}"))
+                continue
+            created, updated, errors = created + c, updated + u, errors + e
+        return created, updated, errors
+
+    def _write(self, chunk):
+        """Stage one chunk without committing; returns (created, updated, errors).
+
+        The chunk's rows are left untouched so a retry starts from the same input.
+        """
+        skus = {row["sku"] for _, row in chunk if "sku" in row}
+        slugs = {row["slug"] for _, row in chunk if "slug" in row}
+        by_sku, by_slug = {}, {}
+        if skus or slugs:
+            rows = db.session.execute(
+                select(Product.id, Product.sku, Product.slug)
+                .where(or_(Product.sku.in_(skus), Product.slug.in_(slugs)))
+            )
+            for pid, sku, slug in rows:
+                if sku:
+                    by_sku[sku] = pid
+                by_slug[slug] = pid
+
+        now = datetime.utcnow()
+        creates, create_images, updates, update_images, errors = [], [], [], {}, []
+        seen_skus, seen_slugs = set(), set()
+        slugs = slug_allocator(db.session, Product)
+        slugs.prime(row["name"] for _, row in chunk if "slug" not in row and "name" in row)
+        for lineno, row in chunk:
+            row = dict(row)
+            try:
+                for field, seen in (("sku", seen_skus), ("slug", seen_slugs)):
+                    if field in row and row[field] in seen:
+                        raise ValueError(f"{field} {row[field]!r} appears twice in one chunk")
+                pid = by_sku.get(row.get("sku")) or by_slug.get(row.get("slug"))
+                images = row.pop("images", None)
+                if "category" in row:
+                    row["category_id"] = self._category_id(row.pop("category"))
+                if pid is not None:
+                    if "slug" in row:
+                        slugs.reserve(row["slug"])
+                    seen_skus.add(row.get("sku"))
+                    seen_slugs.add(row.get("slug"))
+                    updates.append({"id": pid, **row, "updated_at": now})
+                    if images is not None:
+                        update_images[pid] = images
+                    continue
+                missing = [f for f in ("name", "price", "category_id") if f not in row]
+                if missing:
+                    raise ValueError(f"new product needs {', '.join(missing)}")
+                if "slug" in row:
+                    slugs.reserve(row["slug"])
+                else:
+                    row["slug"] = slugs.allocate(row["name"])
+                seen_skus.add(row.get("sku"))
+                seen_slugs.add(row["slug"])
+                creates.append({
+                    "sku": row.get("sku"), "slug": row["slug"], "name": row["name"],
+                    "description": row.get("description", ""), "price": row["price"],
+                    "stock": row.get("stock", 0), "is_active": row.get("is_active", True),
+                    "featured": row.get("featured", False), "category_id": row["category_id"],
+                    "created_at": now, "updated_at": now,
+                })
+                create_images.append(images or [])
+            except ValueError as exc:
+                errors.append((lineno, str(exc)))
+
+        touched, new_images = [], []
+        if creates:
+            new_ids = db.session.scalars(
+                insert(Product).returning(Product.id, sort_by_parameter_order=True), creates
+            ).all()
+            touched += new_ids
+            images = [
+                {"product_id": pid, "image_url": url, "alt_text": "", "updated_at": now}
+                for pid, urls in zip(new_ids, create_images) for url in urls
+            ]
+            if images:
+                new_images += db.session.scalars(insert(ProductImage).returning(ProductImage.id), images).all()
+        if updates:
+            db.session.execute(update(Product), updates)
+            touched += [u["id"] for u in updates]
+        if update_images:
+            db.session.execute(delete(ProductImage).where(ProductImage.product_id.in_(list(update_images))))
+            images = [
+                {"product_id": pid, "image_url": url, "alt_text": "", "updated_at": now}
+                for pid, urls in update_images.items() for url in urls
+            ]
+            if images:
+                new_images += db.session.scalars(insert(ProductImage).returning(ProductImage.id), images).all()
+        reindex_products(db.session.connection(), touched)
+        queue_variants(db.session, new_images)
+        mark_catalog_dirty(db.session)
+        return len(creates), len(updates), errors
+
+def import_catalog(stream, fmt="csv", chunk_size=1000, create_categories=True):
+    return CatalogImporter(chunk_size, create_categories).run(stream, fmt)
+
+def export_rows(chunk_size=1000):
+    """Yield product dicts in id order, holding one chunk of rows in memory at a time."""
+    query = (select(Product)
+             .options(selectinload(Product.category), selectinload(Product.images))
+             .order_by(Product.id)
+             .execution_options(yield_per=chunk_size))
+    for p in db.session.scalars(query):
+        yield {
+            "sku": p.sku or "",
+            "slug": p.slug,
+            "name": p.name,
+            "description": p.description or "",
+            "price": str(p.price),
+            "stock": p.stock,
+            "is_active": bool(p.is_active),
+            "featured": bool(p.featured),
+            "category": p.category.slug if p.category else "",
+            "images": [img.image_url for img in p.images],
+        }
+
+def export_catalog(fmt="jsonl", chunk_size=1000):
+    """Yield the catalog as CSV or JSON Lines text, one record at a time."""
+    if fmt == "jsonl":
+        for row in export_rows(chunk_size):
+            yield json.dumps(row) + "\n"
+        return
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS)
+    writer.writeheader()
+    for row in export_rows(chunk_size):
+        row["images"] = IMAGE_SEPARATOR.join(row["images"])
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    yield buf.getvalue()
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return "jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv"
+
+catalog_cli = AppGroup("catalog", help="Bulk catalog import/export.")
+
+@catalog_cli.command("import")
+@click.argument("path")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), help="Default: from the file extension.")
+@click.option("--chunk-size", default=1000, show_default=True)
+@click.option("--no-create-categories", is_flag=True, help="Reject rows with unknown categories.")
+def import_command(path, fmt, chunk_size, no_create_categories):
+    """Upsert products from a CSV/JSONL file ('-' for stdin)."""
+    fmt = _format_for(path, fmt)
+    stream = sys.stdin.buffer if path == "-" else open(path, "rb")
+    with stream:
+        result = import_catalog(stream, fmt, chunk_size, not no_create_categories)
+    for line, message in result.errors:
+        click.echo(f"line {line}: {message}", err=True)
+    click.echo(result.summary())
+
+@catalog_cli.command("export")
+@click.option("-o", "--output", default="-", help="File path, or '-' for stdout.")
+@click.option("--format", "fmt", type=click.Choice(FORMATS))
+@click.option("--chunk-size", default=1000, show_default=True)
+def export_command(output, fmt, chunk_size):
+    """Write the whole catalog as CSV or JSONL."""
+    fmt = _format_for(output, fmt) if output != "-" else (fmt or "jsonl")
+    out = click.open_file(output, "w", encoding="utf-8")
+    with out:
+        for chunk in export_catalog(fmt, chunk_size):
+            out.write(chunk)
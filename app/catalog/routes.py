@@ -1,31 +1,44 @@
 from flask import Blueprint, render_template, request
-from sqlalchemy import or_
-from ..extensions import db
-from ..models import Product, Category
+from ..models import Product
+from ..search import apply_search
+from ..categories import get_category_tree
+from ..facets import facet_counts
+from ..database import use_replica
+from ..cache import cached_response, is_personalized
+from ..conditional import conditional_response, product_validators
 
 bp = Blueprint("catalog", __name__, template_folder="../templates")
+# Read-only views: catalog queries may be served by the replica
+bp.before_request(use_replica)
 
 @bp.route("/")
+@cached_response(anonymous_only=True)
 def home():
-    featured = Product.query.filter_by(is_active=True, featured=True).order_by(Product.created_at.desc()).limit(8).all()
-    categories = Category.query.order_by(Category.name.asc()).all()
-    return render_template("home.html", featured_products=featured, categories=categories)
+    featured = (Product.query.options(*Product.eager())
+                .filter_by(is_active=True, featured=True)
+                .order_by(Product.created_at.desc()).limit(8).all())
+    tree = get_category_tree()
+    return render_template("home.html", featured_products=featured, categories=tree.ordered,
+                           category_build=tree.build)
 
 @bp.route("/products")
+@cached_response(anonymous_only=True)
 def product_list():
     q = request.args.get("q", "").strip()
     cat = request.args.get("category", "").strip()
     min_price = request.args.get("min_price", "").strip()
     max_price = request.args.get("max_price", "").strip()
+    price_below = request.args.get("price_below", "").strip()
     sort = request.args.get("sort", "").strip()
     page = max(1, int(request.args.get("page", 1)))
 
-    query = Product.query.filter_by(is_active=True).join(Category)
+    query = Product.query.options(*Product.eager()).filter_by(is_active=True)
+    rank = None
     if q:
-        like = f"%{q}%"
-        query = query.filter(or_(Product.name.ilike(like), Product.description.ilike(like)))
+        query, rank = apply_search(query, q)
     if cat:
-        query = query.filter(Category.slug == cat)
+        # Matches the category and all of its descendants
+        query = query.filter(Product.category_id.in_(get_category_tree().ids_for_slug(cat)))
     if min_price:
         try:
             query = query.filter(Product.price >= float(min_price))
@@ -36,6 +49,12 @@ def product_list():
             query = query.filter(Product.price <= float(max_price))
         except ValueError:
             pass
+    if price_below:
+        # Exclusive upper bound, as used by the price facet links
+        try:
+            query = query.filter(Product.price < float(price_below))
+        except ValueError:
+            pass
 
     ordering_map = {
         "price_asc": Product.price.asc(),
@@ -47,22 +66,36 @@ def product_list():
     }
     if sort in ordering_map:
         query = query.order_by(ordering_map[sort])
+    elif rank is not None:
+        query = query.order_by(rank, Product.id)
     else:
         query = query.order_by(Product.created_at.desc())
 
     per_page = int(request.args.get("per_page", 12))
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
 
-    categories = Category.query.order_by(Category.name.asc()).all()
+    categories = get_category_tree().ordered
     return render_template(
         "catalog/product_list.html",
         products=pagination.items,
         pagination=pagination,
         categories=categories,
-        current_filters={"q": q, "category": cat, "min_price": min_price, "max_price": max_price, "sort": sort},
+        facets=facet_counts(q, cat, min_price, max_price, price_below),
+        current_filters={"q": q, "category": cat, "min_price": min_price, "max_price": max_price,
+                         "price_below": price_below, "sort": sort},
     )
 
 @bp.route("/products/<slug>")
+@cached_response(anonymous_only=True)
 def product_detail(slug):
-    product = Product.query.filter_by(slug=slug, is_active=True).first_or_404()
-    return render_template("catalog/product_detail.html", product=product)
\ No newline at end of file
+    product = Product.query.options(*Product.eager()).filter_by(slug=slug, is_active=True).first_or_404()
+    if is_personalized():
+        # Header shows the user and cart, which the product validators don't cover
+        return render_template("catalog/product_detail.html", product=product)
+    etag, last_modified = product_validators(product)
+    response = conditional_response(
+        lambda: render_template("catalog/product_detail.html", product=product),
+        etag, last_modified, "PAGE_CACHE_CONTROL",
+    )
+    response.vary.add("Cookie")
+    return response
\ No newline at end of file
@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from .extensions import db
+from .models import Category
+from .cache import response_cache
+
+# In-memory category tree, loaded with one query and rebuilt after category writes.
+# The version lives in the response cache backend, so with a shared backend (Redis)
+# every process notices a write made by any other; with the per-process backend other
+# workers pick it up after CATEGORY_TREE_MAX_AGE seconds.
+VERSION_KEY = "categories:generation"
+
+class CategoryNode:
+    __slots__ = ("id", "name", "slug", "parent_id", "children")
+
+    def __init__(self, id, name, slug, parent_id):
+        self.id = id
+        self.name = name
+        self.slug = slug
+        self.parent_id = parent_id
+        self.children = []
+
+_builds = itertools.count(1)
+
+class CategoryTree:
+    def __init__(self, rows):
+        self.build = next(_builds)  # tells this tree from any other this process built
+        self.by_id = {r.id: CategoryNode(r.id, r.name, r.slug, r.parent_id) for r in rows}
+        self.by_slug = {n.slug: n for n in self.by_id.values()}
+        self.roots = []
+        for node in self.by_id.values():
+            parent = self.by_id.get(node.parent_id)
+            (parent.children if parent else self.roots).append(node)
+        for node in self.by_id.values():
+            node.children.sort(key=lambda n: n.name)
+        self.roots.sort(key=lambda n: n.name)
+        self.ordered = sorted(self.by_id.values(), key=lambda n: n.name)
+        self._descendants = {}
+        for root in self.roots:
+            self._collect(root, set())
+
+    def _collect(self, node, seen):
+        if node.id in seen:  # guard against parent cycles entered through the admin
+            return frozenset()
+        seen.add(node.id)
+        ids = {node.id}
+        for child in node.children:
+            ids |= self._collect(child, seen)
+        self._descendants[node.id] = frozenset(ids)
+        return self._descendants[node.id]
+
+    def descendant_ids(self, category_id):
+        """Ids of the category and everything below it (empty if unknown)."""
+        return self._descendants.get(category_id, frozenset())
+
+    def ids_for_slug(self, slug):
+        node = self.by_slug.get(slug)
+        return self.descendant_ids(node.id) if node else frozenset()
+
+    def ancestors(self, category_id):
+        """Ids from the category up to its root, inclusive."""
+        chain = []
+        node = self.by_id.get(category_id)
+        while node is not None and node.id not in chain:
+            chain.append(node.id)
+            node = self.by_id.get(node.parent_id)
+        return chain
+
+_lock = threading.Lock()
+_memo = {"version": None, "tree": None, "loaded_at": 0.0}
+
+def categories_version():
+    return response_cache.backend.counter(VERSION_KEY)
+
+def _current(version):
+    max_age = current_app.config.get("CATEGORY_TREE_MAX_AGE", 60)
+    return (_memo["tree"] is not None and _memo["version"] == version
+            and time.monotonic() - _memo["loaded_at"] < max_age)
+
+def get_category_tree():
+    version = categories_version()
+    tree = _memo["tree"]
+    if tree is not None and _current(version):
+        return tree
+    with _lock:
+        if not _current(version):
+            rows = db.session.execute(
+                select(Category.id, Category.name, Category.slug, Category.parent_id)
+            ).all()
+            _memo["tree"], _memo["version"], _memo["loaded_at"] = CategoryTree(rows), version, time.monotonic()
+        return _memo["tree"]
+
+def invalidate_category_tree():
+    response_cache.backend.incr(VERSION_KEY)
+    _memo["tree"] = None
+
+# Invalidation, mirroring the response cache: flag on flush, bump after commit
+_DIRTY = "category_tree_dirty"
+
+def _mark_dirty(mapper, connection, target):
+    sess = object_session(target)
+    if sess is not None:
+        sess.info[_DIRTY] = True
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(Category, _evt, _mark_dirty)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(sess):
+    if sess.info.pop(_DIRTY, False):
+        invalidate_category_tree()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(sess):
+    sess.info.pop(_DIRTY, None)
@@ -0,0 +1,60 @@
+import hashlib
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+
+# Conditional GET support (ETag / Last-Modified) for product pages and the product API.
+# Validators come from updated_at on the product, its category and its images, so a
+# 304 can be answered from the loaded rows without serializing or rendering anything.
+
+def _timestamps(product):
+    yield product.updated_at
+    if product.category is not None:
+        yield product.category.updated_at
+    for img in product.images:
+        yield img.updated_at
+
+def product_fingerprint(product):
+    """Identity + modification times of a product and the related rows it renders."""
+    return (
+        product.id,
+        product.updated_at,
+        product.category.updated_at if product.category is not None else None,
+        tuple((img.id, img.updated_at) for img in product.images),
+    )
+
+def product_validators(products, *extra):
+    """Return ``(etag, last_modified)`` for a product or an ordered list of products.
+
+    ``extra`` folds in anything else that shapes the body (totals, cursors), so a
+    listing changes its ETag when rows enter or leave the result set. Listings get no
+    Last-Modified: a row leaving the page (deactivated, deleted) doesn't move the newest
+    updated_at of the rows left, so If-Modified-Since alone would get a stale 304.
+    """
+    last_modified = None
+    if not isinstance(products, (list, tuple)):
+        stamps = [ts for ts in _timestamps(products) if ts is not None]
+        last_modified = max(stamps) if stamps else None
+        products = [products]
+    digest = hashlib.sha1(repr(([product_fingerprint(p) for p in products], extra)).encode())
+    return f'W/"{digest.hexdigest()}"', last_modified
+
+def not_modified(etag, last_modified):
+    """True when the request's If-None-Match / If-Modified-Since still match."""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def set_validators(response, etag, last_modified, cache_control_key):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.last_modified = last_modified
+    cache_control = current_app.config.get(cache_control_key)
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
+
+def conditional_response(make_body, etag, last_modified, cache_control_key="API_CACHE_CONTROL"):
+    """Answer 304 if the client's copy is current, otherwise build the body via ``make_body()``."""
+    if not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(make_body())
+    return set_validators(response, etag, last_modified, cache_control_key)
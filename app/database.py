@@ -0,0 +1,102 @@
+import sqlite3
+from functools import partial
+import click
+from flask import g, has_app_context
+from flask.cli import AppGroup
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.util import find_tables
+
+# Engine setup: pool options from config, SQLite pragmas on connect, and an optional
+# read replica ("replica" bind) that serves catalog SELECTs in read-only requests.
+REPLICA_BIND = "replica"
+# Tables that may be read from the replica; everything else (carts, orders, users) is
+# read from the primary so a request never sees its own writes missing.
+REPLICA_TABLES = frozenset({"product", "category", "product_image", "product_fts"})
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def engine_options(config, uri):
+    """Pool options for ``uri``; in-memory SQLite keeps Flask-SQLAlchemy's StaticPool."""
+    url = make_url(uri)
+    if _is_memory_sqlite(url):
+        return {}
+    options = {
+        "pool_size": config.get("DB_POOL_SIZE", 5),
+        "max_overflow": config.get("DB_MAX_OVERFLOW", 10),
+        "pool_timeout": config.get("DB_POOL_TIMEOUT", 30),
+    }
+    if url.get_backend_name() != "sqlite":
+        # Server databases drop idle connections; SQLite files have nothing to ping
+        options["pool_recycle"] = config.get("DB_POOL_RECYCLE", 1800)
+        options["pool_pre_ping"] = config.get("DB_POOL_PRE_PING", True)
+    return options
+
+def configure_database(app):
+    """Fill in engine options and the replica bind; call before ``db.init_app``."""
+    config = app.config
+    explicit = config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = {**engine_options(config, config["SQLALCHEMY_DATABASE_URI"]), **explicit}
+    replica = config.get("DATABASE_REPLICA_URL")
+    if replica:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds.setdefault(REPLICA_BIND, {"url": replica, **engine_options(config, replica), **explicit})
+        config["SQLALCHEMY_BINDS"] = binds
+
+def _sqlite_pragmas(config, wal, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if wal:
+        # Readers no longer block the writer (and vice versa); the setting sticks to the file
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}")
+    cursor.close()
+
+def init_database(app, db):
+    """Attach SQLite pragmas to every engine; call after ``db.init_app``."""
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == "sqlite":
+                wal = app.config.get("SQLITE_WAL", True) and not _is_memory_sqlite(engine.url)
+                event.listen(engine, "connect", partial(_sqlite_pragmas, app.config, wal))
+
+def use_replica():
+    """``before_request`` hook for read-only blueprints: catalog SELECTs go to the replica."""
+    g.use_replica = True
+
+def _catalog_only(clause):
+    return all(t.name in REPLICA_TABLES for t in find_tables(clause))
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that routes catalog reads to the replica bind when asked."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_app_context() and g.get("use_replica")):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None and _catalog_only(clause):
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+replica_cli = AppGroup("replica", help="Read replica commands.")
+
+@replica_cli.command("sync")
+def sync_command():
+    """Copy the primary SQLite database onto the replica file (local testing)."""
+    from .extensions import db
+
+    primary, replica = db.engines[None], db.engines.get(REPLICA_BIND)
+    if replica is None:
+        raise click.ClickException("DATABASE_REPLICA_URL is not set.")
+    if primary.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+        raise click.ClickException("sync only copies SQLite files; use real replication elsewhere.")
+    replica.dispose()
+    src, dst = sqlite3.connect(primary.url.database), sqlite3.connect(replica.url.database)
+    with dst:
+        src.backup(dst)
+    src.close()
+    dst.close()
+    click.echo(f"Copied {primary.url.database} -> {replica.url.database}")
@@ -0,0 +1,140 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from flask import current_app
+from sqlalchemy import select
+from .extensions import db
+from .models import Product
+from .cache import response_cache
+from .categories import get_category_tree
+from .search import apply_search
+
+# Facet counts (categories, price buckets, stock) for the product listings.
+# Active products are loaded once into ID sets per category / price bucket / stock
+# state; a request's counts are then set intersections, with no GROUP BY per facet.
+# The index is rebuilt lazily after any catalog commit (same generation as the
+# response cache), and at least every FACET_INDEX_MAX_AGE seconds for commits made
+# by other processes that a per-process backend never hears about.
+
+class FacetIndex:
+    def __init__(self, rows, bucket_edges):
+        """``rows``: (id, category_id, price, stock) for every active product."""
+        self.edges = bucket_edges
+        self.all = frozenset(pid for pid, _, _, _ in rows)
+        self.by_category = {}
+        self.buckets = [set() for _ in range(len(bucket_edges) + 1)]
+        self.in_stock = set()
+        for pid, category_id, price, stock in rows:
+            self.by_category.setdefault(category_id, set()).add(pid)
+            # Bucket i is [edges[i-1], edges[i]), matching the min_price/price_below links
+            self.buckets[bisect_right(bucket_edges, price)].add(pid)
+            if (stock or 0) > 0:
+                self.in_stock.add(pid)
+        by_price = sorted(rows, key=lambda r: r[2])
+        self._prices = [r[2] for r in by_price]
+        self._ids_by_price = [r[0] for r in by_price]
+
+    def price_range(self, low=None, high=None, below=None):
+        """Ids with ``low <= price <= high`` and ``price < below`` (every bound optional)."""
+        lo = bisect_left(self._prices, low) if low is not None else 0
+        hi = bisect_right(self._prices, high) if high is not None else len(self._prices)
+        if below is not None:
+            hi = min(hi, bisect_left(self._prices, below))
+        return set(self._ids_by_price[lo:hi])
+
+    def category_ids(self, category_ids):
+        out = set()
+        for cid in category_ids:
+            out |= self.by_category.get(cid, set())
+        return out
+
+    def facets(self, matched=None, category_ids=None, low=None, high=None, below=None):
+        """Counts for one filter set; each facet ignores its own filter so users can switch.
+
+        ``matched`` restricts to search hits (None = every active product).
+        """
+        base = self.all if matched is None else self.all & matched
+        in_category = base if category_ids is None else base & self.category_ids(category_ids)
+        no_price = low is None and high is None and below is None
+        in_price = base if no_price else base & self.price_range(low, high, below)
+
+        tree = get_category_tree()
+        categories = {}
+        for cid, ids in self.by_category.items():
+            n = len(ids & in_price)
+            if n:
+                for ancestor in tree.ancestors(cid):
+                    categories[ancestor] = categories.get(ancestor, 0) + n
+
+        bounds = [None] + list(self.edges) + [None]
+        prices = []
+        for i, ids in enumerate(self.buckets):
+            n = len(ids & in_category)
+            if n:
+                prices.append({"min": bounds[i], "max": bounds[i + 1], "count": n})
+
+        selected = in_category & in_price
+        return {
+            "total": len(selected),
+            "in_stock": len(selected & self.in_stock),
+            "categories": categories,
+            "prices": prices,
+        }
+
+def bucket_edges(config):
+    raw = config.get("FACET_PRICE_BUCKETS", "")
+    return sorted(float(x) for x in raw.split(",") if x.strip())
+
+_lock = threading.Lock()
+_memo = {"key": None, "index": None, "loaded_at": 0.0}
+
+def _current(key):
+    max_age = current_app.config.get("FACET_INDEX_MAX_AGE", 30)
+    return (_memo["index"] is not None and _memo["key"] == key
+            and time.monotonic() - _memo["loaded_at"] < max_age)
+
+def get_facet_index():
+    key = (id(response_cache.backend), response_cache.generation())
+    index = _memo["index"]
+    if index is not None and _current(key):
+        return index
+    with _lock:
+        if not _current(key):
+            rows = db.session.execute(
+                select(Product.id, Product.category_id, Product.price, Product.stock)
+                .where(Product.is_active.is_(True))
+            ).all()
+            # Prices as floats: bisect needs one comparable type and buckets are coarse anyway
+            rows = [(pid, cid, float(price), stock) for pid, cid, price, stock in rows]
+            _memo["index"], _memo["key"], _memo["loaded_at"] = (
+                FacetIndex(rows, bucket_edges(current_app.config)), key, time.monotonic())
+        return _memo["index"]
+
+def _reset():
+    _memo["index"] = None
+
+response_cache.on_invalidate(_reset)
+
+def _price(value):
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+def facet_counts(q="", category="", min_price="", max_price="", price_below=""):
+    """Facets for the listing filters, taking the raw request values the views read."""
+    matched = None
+    if q:
+        query, _ = apply_search(Product.query.with_entities(Product.id), q)
+        matched = {pid for pid, in query}
+    category_ids = get_category_tree().ids_for_slug(category) if category else None
+    return get_facet_index().facets(matched, category_ids, _price(min_price), _price(max_price), _price(price_below))
+
+def serialize_facets(facets):
+    """JSON shape: category counts as a list with slugs, keyed for clients."""
+    tree = get_category_tree()
+    categories = [
+        {"id": cid, "slug": tree.by_id[cid].slug, "name": tree.by_id[cid].name, "count": n}
+        for cid, n in sorted(facets["categories"].items()) if cid in tree.by_id
+    ]
+    return {**facets, "categories": categories}
@@ -0,0 +1,83 @@
+import threading
+from collections import Counter
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from .cache import LRUCache, NullCache
+from .instrumentation import metrics
+
+# Template fragment cache: {% cache "card", p.id, p.updated_at %}...{% endcache %}
+# renders the body once per key and serves the HTML from a per-process LRU afterwards.
+# Keys carry whatever the fragment depends on (ids, updated_at, the category tree build),
+# so a changed row simply stops matching and its old entry ages out; nothing is purged.
+metrics.describe("template_fragment_cache_total", "counter", "Fragment cache lookups by fragment and result.")
+
+class FragmentCache:
+    def __init__(self):
+        self.backend = NullCache()
+        self.enabled = False
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("FRAGMENT_CACHE_ENABLED", True)
+        self.backend = LRUCache(maxsize=app.config.get("FRAGMENT_CACHE_SIZE", 4096),
+                                default_ttl=app.config.get("FRAGMENT_CACHE_TTL", 300))
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.extensions["fragment_cache"] = self
+
+    def _count(self, name, result):
+        with self._lock:
+            self._stats[(name, result)] += 1
+        metrics.inc("template_fragment_cache_total", (("fragment", name), ("result", result)))
+
+    def render(self, name, key, caller):
+        if not self.enabled:
+            return Markup(caller())
+        html = self.backend.get(key)
+        if html is None:
+            self._count(name, "miss")
+            html = str(caller())
+            self.backend.set(key, html)
+        else:
+            self._count(name, "hit")
+        return Markup(html)
+
+    def stats(self):
+        """{fragment: {"hit": n, "miss": n, "ratio": hits / lookups}} since start (or reset)."""
+        with self._lock:
+            out = {}
+            for (name, result), n in self._stats.items():
+                out.setdefault(name, {"hit": 0, "miss": 0})[result] = n
+        for s in out.values():
+            s["ratio"] = round(s["hit"] / (s["hit"] + s["miss"]), 3)
+        return out
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._stats.clear()
+
+fragment_cache = FragmentCache()
+
+class FragmentCacheExtension(Extension):
+    """Adds ``{% cache part, part, ... %}body{% endcache %}``.
+
+    The key is the template name, the tag's line and the parts; a leading string part
+    also names the fragment in the hit/miss stats.
+    """
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        label = parts[0].value if isinstance(parts[0], nodes.Const) and isinstance(parts[0].value, str) else None
+        name = f"{parser.name}:{label or lineno}"
+        args = [nodes.Const(name), nodes.Const(f"{parser.name}:{lineno}"), nodes.List(parts)]
+        return nodes.CallBlock(self.call_method("_render", args), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, location, parts, caller):
+        return fragment_cache.render(name, f"frag:{location}:{parts!r}", caller)
@@ -0,0 +1,104 @@
+from flask import session
+from flask_login import UserMixin, user_logged_in, user_logged_out
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from .extensions import db
+from .models import User
+from .cache import LRUCache, NullCache, response_cache
+
+# Identity cache for the login manager's user_loader: authenticated requests get a
+# read-only UserSnapshot from a per-process LRU instead of a User row from the database.
+# Entries are dropped when a User write commits in this process; other processes see
+# the change through a per-user version counter in the shared cache backend (Redis),
+# or at the latest after IDENTITY_CACHE_TTL with the in-process backend.
+ADMIN_KEY = "_is_admin"
+
+class UserSnapshot(UserMixin):
+    """The User columns request code reads; detached from any session, so safe to share."""
+
+    def __init__(self, id, username, email, is_admin):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_admin = bool(is_admin)
+
+    def __repr__(self):
+        return f"<UserSnapshot {self.id} {self.username!r}>"
+
+def _version_key(user_id):
+    return f"user:{user_id}:version"
+
+class IdentityCache:
+    def __init__(self):
+        self.local = NullCache()
+
+    def init_app(self, app):
+        size, ttl = app.config.get("IDENTITY_CACHE_SIZE", 1024), app.config.get("IDENTITY_CACHE_TTL", 60)
+        self.local = LRUCache(maxsize=size, default_ttl=ttl) if size and ttl else NullCache()
+
+    def get(self, user_id):
+        version = response_cache.backend.counter(_version_key(user_id))
+        hit = self.local.get(user_id)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        row = db.session.execute(
+            select(User.id, User.username, User.email, User.is_admin).where(User.id == user_id)
+        ).first()
+        if row is None:
+            return None
+        snapshot = UserSnapshot(*row)
+        self.local.set(user_id, (version, snapshot))
+        return snapshot
+
+    def invalidate(self, user_ids):
+        for user_id in user_ids:
+            self.local.delete(user_id)
+            response_cache.backend.incr(_version_key(user_id))
+
+identity_cache = IdentityCache()
+
+def load_user(user_id):
+    """user_loader: cached snapshot; admin rights need the flag captured at login as well."""
+    user = identity_cache.get(int(user_id))
+    if user is None:
+        return None
+    if ADMIN_KEY not in session:
+        # Logged in by remember-me cookie, or a session from before this flag existed
+        session[ADMIN_KEY] = user.is_admin
+    if user.is_admin and not session[ADMIN_KEY]:
+        # Promotions take effect at the next login; demotions (row says False) at once
+        return UserSnapshot(user.id, user.username, user.email, False)
+    return user
+
+def _logged_in(sender, user, **extra):
+    session[ADMIN_KEY] = bool(user.is_admin)
+
+def _logged_out(sender, user, **extra):
+    session.pop(ADMIN_KEY, None)
+
+# Invalidation: collect changed user ids on the session, drop them once it commits
+_CHANGED = "identity_cache_changed"
+
+def _user_changed(mapper, connection, target):
+    sess = object_session(target)
+    if sess is not None and target.id is not None:
+        sess.info.setdefault(_CHANGED, set()).add(target.id)
+
+for _evt in ("after_update", "after_delete"):
+    event.listen(User, _evt, _user_changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(sess):
+    ids = sess.info.pop(_CHANGED, None)
+    if ids:
+        identity_cache.invalidate(ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(sess):
+    sess.info.pop(_CHANGED, None)
+
+def init_identity(app, login_manager):
+    identity_cache.init_app(app)
+    login_manager.user_loader(load_user)
+    user_logged_in.connect(_logged_in, app)
+    user_logged_out.connect(_logged_out, app)
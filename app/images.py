@@ -0,0 +1,239 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import urllib.parse
+import urllib.request
+import click
+from flask import current_app, request, url_for
+from flask.cli import AppGroup
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+from werkzeug.utils import safe_join
+from .extensions import db
+from .models import ProductImage
+from .jobs import enqueue_many, job
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional: without Pillow, templates keep the original image_url
+    Image = ImageOps = None
+
+# Resized product images. Each new (or re-pointed) ProductImage queues an
+# "image_variants" job that writes WebP/JPEG copies at IMAGE_VARIANT_WIDTHS into
+# static/<IMAGE_VARIANT_DIR>, named by content hash, and records them with their
+# dimensions on the row. Templates build <picture> srcsets from them; since a file's
+# name changes whenever its bytes do, the files are served as immutable.
+log = logging.getLogger("app.images")
+
+_FORMATS = {"webp": ("WEBP", "webp"), "jpeg": ("JPEG", "jpg")}
+
+class UnsupportedSource(ValueError):
+    pass
+
+def _csv(value):
+    return [x.strip() for x in str(value).split(",") if x.strip()]
+
+# image_url comes from admin forms and bulk imports, so remote fetches are limited to
+# IMAGE_REMOTE_HOSTS, redirects included; anything else could reach internal addresses
+def _allowed_host(url, hosts):
+    parts = urllib.parse.urlsplit(url)
+    return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in hosts
+
+class _AllowedRedirects(urllib.request.HTTPRedirectHandler):
+    def __init__(self, hosts):
+        self.hosts = hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if not _allowed_host(newurl, self.hosts):
+            raise UnsupportedSource(f"redirect to a host not in IMAGE_REMOTE_HOSTS: {newurl}")
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+def read_source(url):
+    """Bytes of an image referenced by ``image_url``: a /static path or, if allowed, http(s)."""
+    config = current_app.config
+    limit = config.get("IMAGE_MAX_SOURCE_BYTES", 20 * 2**20)
+    if url.startswith(("http://", "https://")):
+        if not config.get("IMAGE_FETCH_REMOTE", False):
+            raise UnsupportedSource(f"remote images are disabled: {url}")
+        hosts = {h.lower() for h in _csv(config.get("IMAGE_REMOTE_HOSTS", ""))}
+        if not _allowed_host(url, hosts):
+            raise UnsupportedSource(f"host not in IMAGE_REMOTE_HOSTS: {url}")
+        opener = urllib.request.build_opener(_AllowedRedirects(hosts))
+        with opener.open(url, timeout=10) as response:
+            data = response.read(limit + 1)
+    else:
+        prefix = current_app.static_url_path.rstrip("/") + "/"
+        if not url.startswith(prefix):
+            raise UnsupportedSource(f"not a static file: {url}")
+        path = safe_join(current_app.static_folder, url[len(prefix):])
+        if path is None or not os.path.isfile(path):
+            raise UnsupportedSource(f"no such file: {url}")
+        with open(path, "rb") as f:
+            data = f.read(limit + 1)
+    if len(data) > limit:
+        raise UnsupportedSource(f"larger than {limit} bytes: {url}")
+    return data
+
+def _write_once(directory, name, data):
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        return  # same name, same bytes
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def make_variants(data, widths, formats, quality, directory, subdir):
+    """Encode ``data`` at each width (never upscaled); returns (width, height, variants)."""
+    with Image.open(io.BytesIO(data)) as source:
+        source = ImageOps.exif_transpose(source)
+        width, height = source.size
+        if source.mode in ("RGBA", "LA", "P"):
+            source = source.convert("RGBA")
+            flat = Image.new("RGB", source.size, (255, 255, 255))
+            flat.paste(source, mask=source.getchannel("A"))
+        else:
+            flat = source = source.convert("RGB")
+        os.makedirs(directory, exist_ok=True)
+        variants = []
+        for target in sorted({min(w, width) for w in widths}):
+            size = (target, max(1, round(height * target / width)))
+            for fmt in formats:
+                pil_format, ext = _FORMATS[fmt]
+                # WebP keeps transparency; JPEG gets the image flattened onto white
+                img = (source if fmt == "webp" else flat)
+                img = img.resize(size, Image.LANCZOS, reducing_gap=3.0) if size != img.size else img
+                buf = io.BytesIO()
+                if fmt == "jpeg":
+                    img.save(buf, pil_format, quality=quality, optimize=True, progressive=True)
+                else:
+                    img.save(buf, pil_format, quality=quality, method=4)
+                encoded = buf.getvalue()
+                name = f"{hashlib.sha256(encoded).hexdigest()[:20]}.{ext}"
+                _write_once(directory, name, encoded)
+                variants.append({"format": fmt, "width": size[0], "height": size[1],
+                                 "file": f"{subdir}/{name}", "bytes": len(encoded)})
+    return width, height, variants
+
+def variant_dir(app):
+    subdir = app.config.get("IMAGE_VARIANT_DIR", "variants").strip("/")
+    return subdir, os.path.join(app.static_folder, subdir)
+
+def generate(image):
+    """Fill in ``image``'s dimensions and variants; the caller commits."""
+    config = current_app.config
+    subdir, directory = variant_dir(current_app)
+    image.width, image.height, image.variants = make_variants(
+        read_source(image.image_url),
+        [int(w) for w in _csv(config.get("IMAGE_VARIANT_WIDTHS", "160,320,640,1280"))],
+        [f for f in _csv(config.get("IMAGE_VARIANT_FORMATS", "webp,jpeg")) if f in _FORMATS],
+        config.get("IMAGE_VARIANT_QUALITY", 80), directory, subdir,
+    )
+
+@job("image_variants")
+def image_variants(image_id):
+    image = db.session.get(ProductImage, image_id)
+    if image is None:
+        return
+    if Image is None:
+        log.warning("Pillow is not installed; no variants for image %s", image_id)
+        return
+    try:
+        generate(image)
+    except (UnsupportedSource, Image.UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        # Retrying won't help; drop variants of a previous image_url and show the original
+        log.warning("No variants for image %s: %s", image_id, exc)
+        image.width = image.height = image.variants = None
+
+# Queue a job for every inserted image, or one whose image_url changed
+_PENDING = "image_variants_pending"
+
+def queue_variants(session, image_ids):
+    """For Core/bulk inserts that skip mapper events."""
+    return enqueue_many("image_variants", ({"image_id": i} for i in image_ids), session)
+
+@event.listens_for(ProductImage, "after_insert")
+def _image_inserted(mapper, connection, target):
+    object_session(target).info.setdefault(_PENDING, set()).add(target.id)
+
+@event.listens_for(ProductImage, "after_update")
+def _image_updated(mapper, connection, target):
+    if inspect(target).attrs.image_url.history.has_changes():
+        object_session(target).info.setdefault(_PENDING, set()).add(target.id)
+
+@event.listens_for(Session, "after_flush_postexec")
+def _enqueue_pending(session, flush_context):
+    ids = session.info.pop(_PENDING, None)
+    if ids:
+        queue_variants(session, sorted(ids))
+
+# Templates ----------------------------------------------------------------
+
+def _by_format(image, fmt):
+    return sorted((v for v in (image.variants or ()) if v["format"] == fmt), key=lambda v: v["width"])
+
+def srcset(image, fmt):
+    return ", ".join(f"{url_for('static', filename=v['file'])} {v['width']}w" for v in _by_format(image, fmt))
+
+def pick_variant(image, fmt, width):
+    """Smallest ``fmt`` variant at least ``width`` wide (the largest if none is)."""
+    variants = _by_format(image, fmt)
+    return next((v for v in variants if v["width"] >= width), variants[-1] if variants else None)
+
+def init_images(app):
+    app.add_template_filter(srcset)
+    app.add_template_filter(pick_variant, "variant")
+    prefix = f"{variant_dir(app)[0]}/"
+
+    @app.after_request
+    def immutable_variants(response):
+        # Content-hashed names: a changed image is a new URL, so caches may keep these forever
+        if (request.endpoint == "static" and response.status_code in (200, 304)
+                and (request.view_args or {}).get("filename", "").startswith(prefix)):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = 31536000
+            response.cache_control.immutable = True
+        return response
+
+images_cli = AppGroup("images", help="Product image variant commands.")
+
+@images_cli.command("generate")
+@click.option("--all", "regenerate", is_flag=True, help="Redo images that already have variants.")
+@click.option("--sync", is_flag=True, help="Resize here instead of queueing jobs for `flask worker`.")
+def generate_command(regenerate, sync):
+    """Create variants for images that have none (e.g. after installing Pillow)."""
+    stmt = select(ProductImage.id).order_by(ProductImage.id)
+    if not regenerate:
+        stmt = stmt.where(ProductImage.variants.is_(None))
+    ids = db.session.scalars(stmt).all()
+    if not sync:
+        queue_variants(db.session, ids)
+        db.session.commit()
+        click.echo(f"Queued {len(ids)} images.")
+        return
+    if Image is None:
+        raise click.ClickException("Pillow is not installed.")
+    for image_id in ids:
+        image_variants(image_id)
+        db.session.commit()
+    click.echo(f"Processed {len(ids)} images.")
+
+@images_cli.command("prune")
+def prune_command():
+    """Delete variant files no image refers to any more."""
+    subdir, directory = variant_dir(current_app)
+    if not os.path.isdir(directory):
+        click.echo("Nothing to prune.")
+        return
+    used = {v["file"].rsplit("/", 1)[-1]
+            for variants in db.session.scalars(select(ProductImage.variants).where(ProductImage.variants.is_not(None)))
+            for v in variants}
+    removed = 0
+    for name in os.listdir(directory):
+        if name not in used and not name.startswith(".tmp-"):
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    click.echo(f"Removed {removed} files.")
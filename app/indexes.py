@@ -0,0 +1,58 @@
+import re
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, text
+from .extensions import db
+from .models import Order, OrderItem, Product, ProductImage
+
+# Tables that must never be read with a full scan on the hot paths below.
+GUARDED_TABLES = {"product", "order", "order_item", "product_image"}
+
+_FULL_SCAN_RE = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+def hot_queries():
+    """(label, statement) pairs mirroring the catalog, API and order access paths."""
+    active = select(Product.id).where(Product.is_active.is_(True))
+    return [
+        ("home featured", active.where(Product.featured.is_(True))
+            .order_by(Product.created_at.desc()).limit(8)),
+        ("list newest", active.order_by(Product.created_at.desc()).limit(12)),
+        ("list by price", active.order_by(Product.price.asc()).limit(12)),
+        ("list by name", active.order_by(Product.name.asc()).limit(12)),
+        ("category tree + price range", active.where(Product.category_id.in_([1, 2, 3]))
+            .where(Product.price >= 10).where(Product.price <= 100)
+            .order_by(Product.price.asc()).limit(12)),
+        ("images for products", select(ProductImage.id).where(ProductImage.product_id.in_([1, 2, 3]))),
+        ("items for order", select(OrderItem.id).where(OrderItem.order_id == 1)),
+        ("orders for user", select(Order.id).where(Order.user_id == 1)),
+    ]
+
+def full_scans(statement, conn):
+    """Return guarded table names the SQLite planner would scan in full for ``statement``."""
+    sql = str(statement.compile(conn, compile_kwargs={"literal_binds": True}))
+    plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+    scanned = []
+    for row in plan:
+        m = _FULL_SCAN_RE.match(row[-1].strip())
+        if m and m.group(1).strip('"') in GUARDED_TABLES:
+            scanned.append(m.group(1).strip('"'))
+    return scanned
+
+indexes_cli = AppGroup("indexes", help="Database index checks.")
+
+@indexes_cli.command("check")
+def check_command():
+    """Fail if a hot query falls back to a full table scan."""
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("Plan check is only implemented for SQLite.")
+    failures = 0
+    with db.engine.connect() as conn:
+        for label, statement in hot_queries():
+            scanned = full_scans(statement, conn)
+            if scanned:
+                failures += 1
+                click.echo(f"FAIL  {label}: full scan of {', '.join(scanned)}")
+            else:
+                click.echo(f"ok    {label}")
+    if failures:
+        raise click.ClickException(f"{failures} queries fall back to a full table scan.")
@@ -0,0 +1,226 @@
+import cProfile
+import hmac
+import logging
+import os
+import threading
+import time
+from flask import abort, g, has_request_context, request, template_rendered, before_render_template
+from flask.sessions import SecureCookieSessionInterface
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in request instrumentation (INSTRUMENTATION_ENABLED):
+#  - Server-Timing header with total, SQL and template time per request
+#  - slow-query log (SLOW_QUERY_MS) on the "app.slow_sql" logger
+#  - Prometheus text metrics at /metrics (only with METRICS_TOKEN), per endpoint;
+#    counters are per process
+#  - cProfile dump of one request when an admin sends PROFILE_HEADER
+slow_sql_log = logging.getLogger("app.slow_sql")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 512, 1024, 2048, 3072, 4096)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, edge in enumerate(self.buckets):
+            if value <= edge:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+class Metrics:
+    """Minimal Prometheus registry: labelled counters and histograms, text exposition."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._help = {}
+
+    def describe(self, name, kind, text):
+        self._help[name] = (kind, text)
+
+    def inc(self, name, labels=(), value=1):
+        with self._lock:
+            key = (name, labels)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=(), buckets=LATENCY_BUCKETS):
+        with self._lock:
+            key = (name, labels)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+            self._histograms[key].observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name, (kind, text) in sorted(self._help.items()):
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self._counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{_labels(labels)} {value}")
+                else:
+                    for (n, labels), h in sorted(self._histograms.items(), key=lambda kv: kv[0]):
+                        if n != name:
+                            continue
+                        for edge, count in zip(h.buckets, h.counts):
+                            lines.append(f"{name}_bucket{_labels(labels + (('le', repr(float(edge))),))} {count}")
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h.total}")
+                        lines.append(f"{name}_sum{_labels(labels)} {h.sum}")
+                        lines.append(f"{name}_count{_labels(labels)} {h.total}")
+        return "\n".join(lines) + "\n"
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+metrics = Metrics()
+metrics.describe("http_request_duration_seconds", "histogram", "Request latency by endpoint.")
+metrics.describe("http_requests_total", "counter", "Requests by endpoint and status.")
+metrics.describe("db_queries_total", "counter", "SQL statements by endpoint.")
+metrics.describe("db_query_duration_seconds", "histogram", "SQL time per request by endpoint.")
+metrics.describe("db_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS.")
+metrics.describe("template_render_duration_seconds", "histogram", "Template render time by template.")
+metrics.describe("session_cookie_bytes", "histogram", "Size of the session cookie written by the response.")
+
+# SQL timing --------------------------------------------------------------
+
+_slow_query_ms = {"threshold": None}
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    endpoint = None
+    if has_request_context() and "_instr" in g:
+        g._instr["sql"] += elapsed
+        g._instr["queries"] += 1
+        endpoint = request.endpoint
+    threshold = _slow_query_ms["threshold"]
+    if threshold is not None and elapsed * 1000 >= threshold:
+        metrics.inc("db_slow_queries_total", (("endpoint", endpoint or "-"),))
+        slow_sql_log.warning("%.1f ms [%s] %s | params=%.200r", elapsed * 1000, endpoint or "-",
+                             " ".join(statement.split()), parameters)
+
+def _discard_start(context):
+    # after_cursor_execute never fires for a failed statement
+    if context.connection is not None and context.connection.info.get("_query_start"):
+        context.connection.info["_query_start"].pop()
+
+# Templates ---------------------------------------------------------------
+
+def _before_render(sender, template, context, **extra):
+    if "_instr" in g:
+        g._instr["tpl_start"].append(time.perf_counter())
+
+def _after_render(sender, template, context, **extra):
+    if "_instr" in g and g._instr["tpl_start"]:
+        elapsed = time.perf_counter() - g._instr["tpl_start"].pop()
+        # Nested renders (includes) would be counted twice; only top-level ones add up
+        if not g._instr["tpl_start"]:
+            g._instr["tpl"] += elapsed
+        metrics.observe("template_render_duration_seconds", elapsed, (("template", template.name or "-"),))
+
+# Session cookie size -----------------------------------------------------
+
+class MeasuredSessionInterface(SecureCookieSessionInterface):
+    """Records the size of the Set-Cookie header the session writes."""
+
+    def save_session(self, app, session, response):
+        super().save_session(app, session, response)
+        name = self.get_cookie_name(app)
+        for header in response.headers.getlist("Set-Cookie"):
+            if header.startswith(name + "="):
+                size = len(header)
+                metrics.observe("session_cookie_bytes", size, buckets=SIZE_BUCKETS)
+                if "Server-Timing" in response.headers:
+                    response.headers["Server-Timing"] += f', session;desc="cookie {size}B"'
+
+# Wiring ------------------------------------------------------------------
+
+def _profile_requested(app):
+    header = app.config.get("PROFILE_HEADER")
+    return bool(header and request.headers.get(header)
+                and current_user.is_authenticated and current_user.is_admin)
+
+def init_instrumentation(app):
+    if not app.config.get("INSTRUMENTATION_ENABLED"):
+        return
+    _slow_query_ms["threshold"] = app.config.get("SLOW_QUERY_MS") or None  # 0 disables the log
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _discard_start)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    if type(app.session_interface) is SecureCookieSessionInterface:
+        app.session_interface = MeasuredSessionInterface()
+
+    @app.before_request
+    def start_timer():
+        g._instr = {"start": time.perf_counter(), "sql": 0.0, "queries": 0, "tpl": 0.0, "tpl_start": []}
+        if _profile_requested(app):
+            g._profiler = cProfile.Profile()
+            g._profiler.enable()
+
+    @app.after_request
+    def record_timing(response):
+        instr = g.pop("_instr", None)
+        if instr is None:
+            return response
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            response.headers["X-Profile-File"] = _dump_profile(app, profiler)
+        total = time.perf_counter() - instr["start"]
+        endpoint = request.endpoint or "unmatched"
+        labels = (("endpoint", endpoint), ("method", request.method))
+        metrics.observe("http_request_duration_seconds", total, labels)
+        metrics.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+        metrics.inc("db_queries_total", (("endpoint", endpoint),), instr["queries"])
+        metrics.observe("db_query_duration_seconds", instr["sql"], (("endpoint", endpoint),))
+        response.headers["Server-Timing"] = (
+            f'app;dur={total * 1000:.1f}, '
+            f'db;dur={instr["sql"] * 1000:.1f};desc="{instr["queries"]} queries", '
+            f'tpl;dur={instr["tpl"] * 1000:.1f}'
+        )
+        return response
+
+    @app.get("/metrics")
+    def prometheus_metrics():
+        token = app.config.get("METRICS_TOKEN")
+        if not token:
+            abort(404)  # timings and cache stats are not for everyone; no token, no endpoint
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return "Forbidden\n", 403
+        return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+def _dump_profile(app, profiler):
+    directory = app.config.get("PROFILE_DIR") or os.path.join(app.instance_path, "profiles")
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{os.getpid()}-{threading.get_ident()}.prof"
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+    app.logger.info("Profile for %s %s written to %s", request.method, request.path, path)
+    return name
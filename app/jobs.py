@@ -0,0 +1,249 @@
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, event, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+from .extensions import db
+from .models import Job
+
+# Background jobs kept in the "job" table and run by `flask worker` threads.
+#  - enqueue() adds the row to the caller's transaction: the job exists only if that
+#    transaction commits, and workers never see work for a rolled-back order
+#  - workers claim one row at a time with a conditional UPDATE, so any number of
+#    worker processes can share the table; a claim older than JOBS_LEASE_SECONDS is
+#    taken to be from a dead worker and run again
+#  - a handler's writes and the job's "done" mark commit together; failures are
+#    retried with exponential backoff up to max_attempts, then left "failed"
+log = logging.getLogger("app.jobs")
+
+HANDLERS = {}
+
+def job(name):
+    """Register a handler: ``@job("order_placed") def order_placed(order_id): ...``.
+
+    Handlers receive the payload as keyword arguments and must not commit; they may run
+    more than once (after a crash or retry), so side effects should be idempotent.
+    """
+    def register(fn):
+        HANDLERS[name] = fn
+        return fn
+    return register
+
+def enqueue(name, payload=None, key=None, delay=0, max_attempts=None, session=None):
+    """Queue ``name`` inside the current transaction; returns the Job.
+
+    With an idempotency ``key`` a job already queued under it is returned instead.
+    """
+    if name not in HANDLERS:
+        raise LookupError(f"No job handler registered for {name!r}")
+    session = session or db.session
+    if key is not None:
+        existing = session.scalar(select(Job).where(Job.idempotency_key == key))
+        if existing is not None:
+            return existing
+    new = Job(
+        name=name, payload=payload or {}, idempotency_key=key, status="queued", attempts=0,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+        max_attempts=max_attempts or current_app.config.get("JOBS_MAX_ATTEMPTS", 5),
+    )
+    if key is None:
+        session.add(new)
+    else:
+        try:
+            with session.begin_nested():
+                session.add(new)
+        except IntegrityError:
+            # Another transaction committed the same key between our check and insert
+            return session.scalar(select(Job).where(Job.idempotency_key == key))
+    session.info["jobs_enqueued"] = True
+    return new
+
+def enqueue_many(name, payloads, session=None):
+    """Queue one job per payload with a single INSERT (no idempotency keys); returns the count.
+
+    Unlike enqueue() this adds no objects, so flush event handlers may call it.
+    """
+    if name not in HANDLERS:
+        raise LookupError(f"No job handler registered for {name!r}")
+    payloads = list(payloads)
+    if not payloads:
+        return 0
+    session = session or db.session
+    now = datetime.utcnow()
+    max_attempts = current_app.config.get("JOBS_MAX_ATTEMPTS", 5)
+    session.connection().execute(insert(Job), [
+        {"name": name, "payload": payload, "status": "queued", "attempts": 0, "max_attempts": max_attempts,
+         "run_at": now, "created_at": now}
+        for payload in payloads
+    ])
+    session.info["jobs_enqueued"] = True
+    return len(payloads)
+
+# Wakes idle workers in this process once an enqueuing transaction commits; workers
+# in other processes pick the job up on their next poll.
+_wakeup = threading.Event()
+
+@event.listens_for(Session, "after_commit")
+def _notify_workers(session):
+    if session.info.pop("jobs_enqueued", False):
+        _wakeup.set()
+
+@event.listens_for(Session, "after_rollback")
+def _drop_notification(session):
+    session.info.pop("jobs_enqueued", None)
+
+def retry_delay(attempts, base):
+    """Seconds before attempt ``attempts + 1``: base * 2**(attempts-1), jittered, capped at an hour."""
+    return min(base * (2 ** max(attempts - 1, 0)) * (1 + random.random()), 3600)
+
+def requeue(ids=None):
+    """Put failed jobs (or the given ``ids``, whatever their state) back in the queue."""
+    stmt = update(Job).values(status="queued", attempts=0, run_at=datetime.utcnow(),
+                              locked_by=None, locked_at=None, finished_at=None)
+    stmt = stmt.where(Job.id.in_(ids)) if ids is not None else stmt.where(Job.status == "failed")
+    count = db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.session.commit()
+    return count
+
+class Worker:
+    """Runs queued jobs on ``threads`` threads, each with its own app context and session."""
+
+    def __init__(self, app, threads=None, burst=False):
+        self.app = app
+        self.threads = threads or app.config.get("JOBS_WORKER_THREADS", 4)
+        self.burst = burst
+        self.poll = app.config.get("JOBS_POLL_INTERVAL", 1.0)
+        self.lease = app.config.get("JOBS_LEASE_SECONDS", 300)
+        self.backoff = app.config.get("JOBS_RETRY_BACKOFF", 10.0)
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _ready(self, now):
+        stale = now - timedelta(seconds=self.lease)
+        return or_((Job.status == "queued") & (Job.run_at <= now),
+                   (Job.status == "running") & (Job.locked_at < stale))
+
+    def claim(self, owner):
+        """Mark the next due job as running for ``owner``; returns its id or None."""
+        now = datetime.utcnow()
+        ready = self._ready(now)
+        next_id = select(Job.id).where(ready).order_by(Job.run_at, Job.id).limit(1).scalar_subquery()
+        # The outer condition repeats ``ready`` so a row another worker claimed meanwhile is skipped
+        stmt = (update(Job).where(Job.id == next_id, ready)
+                .values(status="running", locked_by=owner, locked_at=now, attempts=Job.attempts + 1)
+                .returning(Job.id).execution_options(synchronize_session=False))
+        try:
+            job_id = db.session.execute(stmt).scalar()
+            db.session.commit()
+        except OperationalError:
+            db.session.rollback()
+            return None
+        return job_id
+
+    def run(self, job_id):
+        current = db.session.get(Job, job_id)
+        handler = HANDLERS.get(current.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No job handler registered for {current.name!r}")
+            handler(**current.payload)
+            current.status, current.finished_at, current.last_error = "done", datetime.utcnow(), None
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            error = traceback.format_exc()
+            current = db.session.get(Job, job_id)
+            current.last_error = error[-4000:]
+            if current.attempts >= current.max_attempts:
+                current.status, current.finished_at = "failed", datetime.utcnow()
+                log.error("Job %s (%s) failed for good after %s attempts", job_id, current.name, current.attempts)
+            else:
+                current.status = "queued"
+                current.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(current.attempts, self.backoff))
+                log.warning("Job %s (%s) failed, retrying at %s", job_id, current.name, current.run_at)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+    def _loop(self, owner):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                job_id = self.claim(owner)
+                if job_id is not None:
+                    self.run(job_id)
+                    continue
+                db.session.remove()
+                if self.burst:
+                    return
+                if _wakeup.wait(self.poll):
+                    _wakeup.clear()
+
+    def start(self):
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, args=(f"{self.name}:{i}",), name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        _wakeup.set()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+        return not any(t.is_alive() for t in self._threads)
+
+@click.command("worker")
+@click.option("--threads", type=int, help="Worker threads (default JOBS_WORKER_THREADS).")
+@click.option("--burst", is_flag=True, help="Exit once no job is due instead of polling.")
+@with_appcontext
+def worker_command(threads, burst):
+    """Run background jobs from the job table until interrupted."""
+    worker = Worker(current_app._get_current_object(), threads, burst)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    worker.start()
+    click.echo(f"Worker {worker.name} running {worker.threads} threads; jobs: {', '.join(sorted(HANDLERS))}")
+    try:
+        while not worker.join(0.5):
+            pass
+    except KeyboardInterrupt:
+        click.echo("Stopping; waiting for running jobs to finish...")
+        worker.stop()
+        worker.join()
+
+jobs_cli = AppGroup("jobs", help="Background job queue commands.")
+
+@jobs_cli.command("stats")
+def stats_command():
+    """Job counts by name and status."""
+    rows = db.session.execute(
+        select(Job.name, Job.status, func.count()).group_by(Job.name, Job.status).order_by(Job.name, Job.status)
+    ).all()
+    for name, status, count in rows:
+        click.echo(f"{name:<24} {status:<8} {count}")
+    if not rows:
+        click.echo("No jobs.")
+
+@jobs_cli.command("retry")
+def retry_command():
+    """Requeue every failed job."""
+    click.echo(f"Requeued {requeue()} jobs.")
+
+@jobs_cli.command("purge")
+@click.option("--days", default=7, show_default=True, help="Delete finished jobs older than this.")
+def purge_command(days):
+    """Delete done jobs finished more than --days ago."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    count = db.session.execute(delete(Job).where(Job.status == "done", Job.finished_at < cutoff)).rowcount
+    db.session.commit()
+    click.echo(f"Deleted {count} jobs.")
@@ -0,0 +1,58 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib provider is used instead
+    orjson = None
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask's default provider with orjson doing the encoding and decoding.
+
+    Datetimes are passed through to the same ``default`` hook as Flask's provider
+    (HTTP dates), so output matches the stdlib provider apart from whitespace and
+    non-ASCII escaping.
+    """
+
+    def _options(self):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:  # json.dumps-only arguments (indent, separators, ...)
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj, self._options()).decode()
+
+    def _encode(self, obj, options):
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits; let the stdlib encoder decide
+            return super().dumps(obj).encode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options()
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return self._app.response_class(self._encode(obj, options) + b"\n", mimetype=self.mimetype)
+
+JSON_PROVIDERS = {
+    "stdlib": DefaultJSONProvider,
+    "orjson": OrjsonProvider,
+}
+
+def init_json(app):
+    """Install the JSON provider named by JSON_PROVIDER ("auto" picks orjson when installed)."""
+    name = app.config.get("JSON_PROVIDER", "auto")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+    app.json = JSON_PROVIDERS[name](app)
@@ -1,8 +1,12 @@
 from datetime import datetime
-from sqlalchemy import event
-from werkzeug.security import generate_password_hash, check_password_hash
-from slugify import slugify
+from flask import current_app
+from sqlalchemy import bindparam, event, func, inspect, select, update
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session, joinedload, lazyload, object_session, selectinload
+from sqlalchemy.orm.util import identity_key
 from .extensions import db
+from .slugs import auto_slug
+from .passwords import password_hasher
 from flask_login import UserMixin
 
 class User(db.Model, UserMixin):
@@ -13,10 +17,13 @@ class User(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False)
 
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        return password_hasher.needs_rehash(self.password_hash)
 
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -24,31 +31,63 @@ class Category(db.Model):
     slug = db.Column(db.String(220), unique=True, index=True, nullable=False)
     parent_id = db.Column(db.Integer, db.ForeignKey("category.id"))
     parent = db.relationship("Category", remote_side=[id], backref="children")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Product(db.Model):
+    __table_args__ = (
+        # Access paths used by catalog/API listings (see `flask indexes check`)
+        db.Index("ix_product_active_category_price", "is_active", "category_id", "price"),
+        db.Index("ix_product_active_created", "is_active", "created_at"),
+        db.Index("ix_product_active_price", "is_active", "price"),
+        db.Index("ix_product_active_name", "is_active", "name"),
+        db.Index("ix_product_active_featured_created", "is_active", "featured", "created_at"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
     category = db.relationship("Category", backref="products")
     name = db.Column(db.String(255), nullable=False)
     slug = db.Column(db.String(280), unique=True, index=True, nullable=False)
+    sku = db.Column(db.String(64), unique=True, index=True)
     description = db.Column(db.Text, default="")
     price = db.Column(db.Numeric(10, 2), nullable=False)
     stock = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
     featured = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    @classmethod
+    def eager(cls, images=None, category=None):
+        """Loader options for images/category; strategies default to PRODUCT_*_LOADER config."""
+        images = images or current_app.config.get("PRODUCT_IMAGES_LOADER", "selectin")
+        category = category or current_app.config.get("PRODUCT_CATEGORY_LOADER", "joined")
+        return [
+            LOADER_STRATEGIES[images](cls.images),
+            LOADER_STRATEGIES[category](cls.category),
+        ]
+
+LOADER_STRATEGIES = {
+    "joined": joinedload,
+    "selectin": selectinload,
+    "lazy": lazyload,
+}
 
 class ProductImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False, index=True)
     product = db.relationship("Product", backref="images")
     image_url = db.Column(db.String(500), nullable=False)
     alt_text = db.Column(db.String(255), default="")
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Filled in by the image_variants job (app/images.py): source size and resized copies
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    variants = db.Column(db.JSON(none_as_null=True))  # [{"format", "width", "height", "file", "bytes"}], file relative to static/
 
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), index=True)
     user = db.relationship("User", backref="orders")
     first_name = db.Column(db.String(120), nullable=False)
     last_name = db.Column(db.String(120), nullable=False)
@@ -58,38 +97,120 @@ class Order(db.Model):
     postal_code = db.Column(db.String(20), nullable=False)
     payment_reference = db.Column(db.String(120), default="")
     status = db.Column(db.String(20), default="pending")  # pending, processing, shipped, delivered, cancelled
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Denormalized from order_item: set at checkout, recomputed when items change
+    subtotal = db.Column(db.Numeric(10, 2), nullable=False, default=0)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Numeric(10, 2), nullable=False, default=0)
 
-    @property
+    @hybrid_property
     def total_cost(self):
-        return sum(item.price * item.quantity for item in self.items)
+        return self.total
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey("order.id"), nullable=False, index=True)
     order = db.relationship("Order", backref="items")
     product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
     product = db.relationship("Product")
     price = db.Column(db.Numeric(10, 2), nullable=False)
     quantity = db.Column(db.Integer, default=1)
 
-# Helpers to auto-generate slugs
-def _unique_slug(model, base):
-    base = slugify(base)
-    slug = base or "item"
-    i = 1
-    with db.session.no_autoflush:
-        while db.session.query(model).filter_by(slug=slug).first():
-            i += 1
-            slug = f"{base}-{i}"
-    return slug
-
-@event.listens_for(Category, "before_insert")
-def cat_before_insert(mapper, connection, target):
-    if not target.slug:
-        target.slug = _unique_slug(Category, target.name)
-
-@event.listens_for(Product, "before_insert")
-def prod_before_insert(mapper, connection, target):
-    if not target.slug:
-        target.slug = _unique_slug(Product, target.name)
\ No newline at end of file
+class DailySales(db.Model):
+    """Sales rollup per day x product x category; maintained by app.reports.utils."""
+    __tablename__ = "daily_sales"
+    __table_args__ = (db.UniqueConstraint("day", "product_id", "category_id", name="uq_daily_sales_key"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False, index=True)
+    product = db.relationship("Product")
+    category_id = db.Column(db.Integer, db.ForeignKey("category.id"), nullable=False)
+    category = db.relationship("Category")
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+
+class Cart(db.Model):
+    """Server-side cart: owned by a user, or by an anonymous token kept in the session cookie."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), unique=True, index=True)
+    token = db.Column(db.String(64), unique=True, index=True)
+    item_count = db.Column(db.Integer, default=0, nullable=False)  # sum of quantities, kept by cart.utils
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class CartItem(db.Model):
+    __table_args__ = (db.UniqueConstraint("cart_id", "product_id", name="uq_cart_item_product"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    cart_id = db.Column(db.Integer, db.ForeignKey("cart.id"), nullable=False)
+    cart = db.relationship("Cart", backref=db.backref("items", cascade="all, delete-orphan"))
+    product_id = db.Column(db.Integer, db.ForeignKey("product.id"), nullable=False)
+    product = db.relationship("Product")
+    quantity = db.Column(db.Integer, default=1, nullable=False)
+
+class Job(db.Model):
+    """Background job queued in the database and run by `flask worker` (see app/jobs.py)."""
+    __table_args__ = (db.Index("ix_job_status_run_at", "status", "run_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    idempotency_key = db.Column(db.String(200), unique=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(200))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+# Keep Order.subtotal/item_count/total in step with ORM edits to its items
+# (checkout bulk-inserts items and sets the totals itself)
+_order_items = OrderItem.__table__
+_line_sum = (select(func.coalesce(func.sum(_order_items.c.price * _order_items.c.quantity), 0))
+             .where(_order_items.c.order_id == Order.__table__.c.id).scalar_subquery())
+_qty_sum = (select(func.coalesce(func.sum(_order_items.c.quantity), 0))
+            .where(_order_items.c.order_id == Order.__table__.c.id).scalar_subquery())
+_retotal_order = (update(Order.__table__)
+                  .where(Order.__table__.c.id == bindparam("oid"))
+                  .values(subtotal=_line_sum, item_count=_qty_sum, total=_line_sum))
+
+def _queue_order_retotal(mapper, connection, target):
+    ids = object_session(target).info.setdefault("orders_to_retotal", set())
+    ids.add(target.order_id)
+    ids.update(oid for oid in inspect(target).attrs.order_id.history.deleted if oid)
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(OrderItem, _evt, _queue_order_retotal)
+
+@event.listens_for(Session, "after_flush_postexec")
+def _retotal_orders(session, flush_context):
+    ids = session.info.pop("orders_to_retotal", None)
+    if not ids:
+        return
+    session.connection().execute(_retotal_order, [{"oid": oid} for oid in ids if oid])
+    for oid in ids:
+        order = session.identity_map.get(identity_key(Order, oid))
+        if order is not None:
+            session.expire(order, ["subtotal", "item_count", "total"])
+
+# A deleted image leaves no updated_at behind; move its product's so the product's
+# Last-Modified (app/conditional.py) and cached fragments change with it
+_products = Product.__table__
+
+@event.listens_for(ProductImage, "after_delete")
+def _touch_product(mapper, connection, target):
+    connection.execute(update(_products).where(_products.c.id == target.product_id)
+                       .values(updated_at=datetime.utcnow()))
+    session = object_session(target)
+    product = session.identity_map.get(identity_key(Product, target.product_id)) if session else None
+    if product is not None:
+        session.expire(product, ["updated_at"])
+
+# Slugs are filled in from the name on insert (see app/slugs.py)
+auto_slug(Category)
+auto_slug(Product)
\ No newline at end of file
@@ -2,8 +2,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash
 from flask_login import login_required, current_user
 from ..forms import CheckoutForm
 from ..extensions import db
-from ..models import Order, OrderItem, Product
 from ..cart.utils import cart_items, cart_total, clear_cart
+from .utils import InsufficientStock, place_order
 
 bp = Blueprint("orders", __name__, template_folder="../templates/orders")
 
@@ -17,45 +17,27 @@ def checkout():
 
     form = CheckoutForm()
     if form.validate_on_submit():
+        fields = {
+            "first_name": form.first_name.data,
+            "last_name": form.last_name.data,
+            "email": form.email.data,
+            "address": form.address.data,
+            "city": form.city.data,
+            "postal_code": form.postal_code.data,
+            "payment_reference": form.payment_reference.data or "",
+        }
         try:
-            # Create order and items atomically
-            order = Order(
-                user=current_user,
-                first_name=form.first_name.data,
-                last_name=form.last_name.data,
-                email=form.email.data,
-                address=form.address.data,
-                city=form.city.data,
-                postal_code=form.postal_code.data,
-                payment_reference=form.payment_reference.data or "",
-                status="pending",
-            )
-            db.session.add(order)
-            db.session.flush()  # get order.id
-
-            for it in items:
-                product: Product = it["product"]
-                qty = int(it["quantity"])
-                if product.stock < qty:
-                    db.session.rollback()
-                    flash(f"Insufficient stock for {product.name}.", "danger")
-                    return redirect(url_for("cart.detail"))
-                db.session.add(OrderItem(
-                    order=order,
-                    product=product,
-                    price=product.price,
-                    quantity=qty
-                ))
-                product.stock -= qty
-                db.session.add(product)
-
-            db.session.commit()
-            clear_cart()
-            flash(f"Order #{order.id} placed successfully!", "success")
-            return redirect(url_for("orders.success", order_id=order.id))
+            order = place_order(current_user, fields, items)
+        except InsufficientStock as exc:
+            flash(f"Insufficient stock for {exc.product.name}.", "danger")
+            return redirect(url_for("cart.detail"))
         except Exception:
             db.session.rollback()
             flash("Error placing order. Please try again.", "danger")
+        else:
+            clear_cart()
+            flash(f"Order #{order.id} placed successfully!", "success")
+            return redirect(url_for("orders.success", order_id=order.id))
 
     return render_template("orders/checkout.html", items=items, total=cart_total(), form=form)
 
@@ -0,0 +1,194 @@
+import logging
+import os
+import random
+import smtplib
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from email.message import EmailMessage
+from types import SimpleNamespace
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import OperationalError
+from ..extensions import db
+from ..models import Order, OrderItem, Product
+from ..cache import mark_catalog_dirty
+from ..reports.utils import apply_order
+from ..jobs import enqueue, job
+
+mail_log = logging.getLogger("app.mail")
+
+class InsufficientStock(Exception):
+    def __init__(self, product):
+        super().__init__(f"Insufficient stock for {product.name}")
+        self.product = product
+
+_LOCK_ERRORS = ("database is locked", "deadlock", "could not serialize", "lock wait timeout")
+
+def _is_lock_error(exc):
+    return any(msg in str(exc.orig).lower() for msg in _LOCK_ERRORS)
+
+# UPDATE product SET stock = stock - :qty WHERE id = :pid AND stock >= :qty
+_decrement = (
+    update(Product.__table__)
+    .where(Product.__table__.c.id == bindparam("pid"))
+    .where(Product.__table__.c.stock >= bindparam("qty"))
+    .values(stock=Product.__table__.c.stock - bindparam("qty"), updated_at=bindparam("now"))
+)
+
+def reserve_stock(lines):
+    """Atomically take ``{product_id: qty}`` out of stock in one batched UPDATE.
+
+    Returns False if any row lacked stock; rows that did have enough were still
+    decremented, so the caller must roll back.
+    """
+    now = datetime.utcnow()
+    # Fixed id order keeps concurrent checkouts from locking rows in opposite orders
+    params = [{"pid": pid, "qty": qty, "now": now} for pid, qty in sorted(lines.items())]
+    conn = db.session.connection()
+    if conn.dialect.supports_sane_multi_rowcount:
+        return conn.execute(_decrement, params).rowcount == len(params)
+    return all(conn.execute(_decrement, p).rowcount == 1 for p in params)
+
+def _short_product(lines, products):
+    stock = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(list(lines))).all())
+    for pid, qty in lines.items():
+        if (stock.get(pid) or 0) < qty:
+            return products[pid]
+    return products[next(iter(lines))]
+
+def place_order(user, fields, items):
+    """Create an order for cart ``items`` with an atomic stock reservation.
+
+    Retries the whole transaction with exponential backoff when the database reports
+    lock contention. Raises InsufficientStock (after rolling back) if any line can't
+    be covered.
+    """
+    lines = Counter()
+    products = {}
+    for it in items:
+        lines[it["product"].id] += int(it["quantity"])
+        products[it["product"].id] = it["product"]
+    prices = {pid: p.price for pid, p in products.items()}
+    subtotal = sum((prices[pid] * qty for pid, qty in lines.items()), Decimal("0.00"))
+
+    retries = current_app.config.get("CHECKOUT_MAX_RETRIES", 5)
+    backoff = current_app.config.get("CHECKOUT_RETRY_BACKOFF", 0.05)
+    for attempt in range(retries + 1):
+        try:
+            order = Order(user_id=user.id, status="pending", subtotal=subtotal,
+                          item_count=sum(lines.values()), total=subtotal, **fields)
+            db.session.add(order)
+            db.session.flush()  # get order.id
+            if not reserve_stock(lines):
+                db.session.rollback()
+                raise InsufficientStock(_short_product(lines, products))
+            db.session.execute(insert(OrderItem), [
+                {"order_id": order.id, "product_id": pid, "price": prices[pid], "quantity": qty}
+                for pid, qty in lines.items()
+            ])
+            apply_order(db.session.connection(), order.id)
+            mark_catalog_dirty(db.session)
+            # Committed with the order; emails and other follow-up run in `flask worker`
+            enqueue("order_placed", {"order_id": order.id}, key=f"order_placed:{order.id}")
+            db.session.commit()
+            return order
+        except OperationalError as exc:
+            db.session.rollback()
+            if attempt == retries or not _is_lock_error(exc):
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+def send_order_confirmation(order):
+    """Email the order summary via MAIL_SERVER; only logged when no server is configured."""
+    msg = EmailMessage()
+    msg["Subject"] = f"Order #{order.id} confirmation"
+    msg["From"] = current_app.config.get("MAIL_SENDER", "shop@localhost")
+    msg["To"] = order.email
+    lines = [f"{it.quantity} x {it.product.name} @ {it.price}" for it in order.items]
+    msg.set_content(f"Hi {order.first_name},\n\nThanks for your order.\n\n" + "\n".join(lines)
+                    + f"\n\nTotal: {order.total}\n")
+    server = current_app.config.get("MAIL_SERVER")
+    if not server:
+        mail_log.info("Would send %r to %s", msg["Subject"], order.email)
+        return
+    with smtplib.SMTP(server, current_app.config.get("MAIL_PORT", 25), timeout=30) as smtp:
+        smtp.send_message(msg)
+
+@job("order_placed")
+def order_placed(order_id):
+    """Post-checkout work for one order."""
+    order = db.session.get(Order, order_id)
+    if order is not None:
+        send_order_confirmation(order)
+
+orders_cli = AppGroup("orders", help="Order and checkout commands.")
+
+@orders_cli.command("stress")
+@click.option("--buyers", default=60, show_default=True, help="Concurrent checkout threads.")
+@click.option("--stock", default=25, show_default=True, help="Units available to fight over.")
+@click.option("--quantity", default=1, show_default=True, help="Units per order.")
+def stress_command(buyers, stock, quantity):
+    """Race concurrent checkouts for one product against a throwaway SQLite DB."""
+    from .. import create_app
+    from ..models import Category, User
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'stress.db')}",
+            "SQLALCHEMY_ENGINE_OPTIONS": {"pool_size": buyers, "connect_args": {"timeout": 30}},
+        })
+        with app.app_context():
+            db.create_all()
+            product = Product(name="Contended", price=10, stock=stock, category=Category(name="Stress"))
+            db.session.add(product)
+            users = [User(username=f"buyer{i}", email=f"buyer{i}@example.com", password_hash="x")
+                     for i in range(buyers)]
+            db.session.add_all(users)
+            db.session.commit()
+            product_id, user_ids = product.id, [u.id for u in users]
+
+        barrier = threading.Barrier(buyers)
+
+        def buy(user_id):
+            with app.app_context():
+                p = db.session.get(Product, product_id)
+                db.session.expunge(p)
+                db.session.close()  # don't hold a connection while waiting at the barrier
+                items = [{"product": p, "quantity": quantity}]
+                fields = {"first_name": "S", "last_name": "T", "email": "s@t.example",
+                          "address": "-", "city": "-", "postal_code": "-"}
+                barrier.wait()
+                try:
+                    place_order(SimpleNamespace(id=user_id), fields, items)
+                    return "ok"
+                except InsufficientStock:
+                    return "sold_out"
+                except OperationalError:
+                    return "lock_timeout"
+                finally:
+                    db.session.remove()
+
+        started = time.perf_counter()
+        # One thread per buyer so all of them reach the barrier; outcomes are tallied here
+        with ThreadPoolExecutor(max_workers=buyers) as pool:
+            outcomes = Counter(pool.map(buy, user_ids))
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            final = db.session.get(Product, product_id).stock
+            sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)).scalar()
+            orders = Order.query.count()
+            db.engine.dispose()
+
+    click.echo(f"{buyers} buyers in {elapsed:.2f}s: {dict(outcomes)}")
+    click.echo(f"stock {stock} -> {final}, units sold {sold}, orders {orders}")
+    if final < 0 or sold != stock - final or orders != outcomes["ok"]:
+        raise click.ClickException("Stock invariant violated.")
+    click.echo("OK: no oversell.")
@@ -0,0 +1,109 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Password hashing off the request threads: scrypt/pbkdf2 run in a small process pool
+# (PASSWORD_HASH_WORKERS; 0 hashes inline) and at most PASSWORD_HASH_QUEUE more hashes
+# may wait for it. Beyond that callers get HashingBusy at once, so a login burst is
+# answered with 503s instead of tying up every worker thread behind the pool.
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated; answer 503 and let the client retry."""
+
+_DEFAULT_PARAMS = {"scrypt": ["32768", "8", "1"], "pbkdf2": ["sha256", str(DEFAULT_PBKDF2_ITERATIONS)]}
+
+def normalize_method(method):
+    """Werkzeug method with every parameter spelled out, as it appears in stored hashes.
+
+    ``"scrypt"`` -> ``"scrypt:32768:8:1"``, ``"pbkdf2"`` -> ``"pbkdf2:sha256:600000"``.
+    """
+    name, *params = method.split(":")
+    if name not in _DEFAULT_PARAMS:
+        raise ValueError(f"Unsupported PASSWORD_HASH_METHOD: {method!r}")
+    defaults = _DEFAULT_PARAMS[name]
+    return ":".join([name, *params, *defaults[len(params):]])
+
+def _pool_context():
+    # Workers must not inherit the app's threads, sockets and DB connections. Like any
+    # spawned child they re-import a script __main__, so scripts need a __main__ guard.
+    methods = multiprocessing.get_all_start_methods()
+    if "forkserver" in methods:
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["werkzeug.security"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+class PasswordHasher:
+    def __init__(self):
+        self.method = normalize_method("scrypt")
+        self.workers = 0
+        self.timeout = 10
+        self._slots = threading.BoundedSemaphore(16)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = normalize_method(app.config.get("PASSWORD_HASH_METHOD", "scrypt"))
+        workers = app.config.get("PASSWORD_HASH_WORKERS", 2)
+        if workers != self.workers:
+            self.shutdown()
+        self.workers = workers
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 10)
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + app.config.get("PASSWORD_HASH_QUEUE", 16))
+        app.extensions["password_hasher"] = self
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=_pool_context())
+            return self._pool
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusy()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                slots.release()
+        try:
+            future = self._executor().submit(fn, *args)
+        except BaseException as exc:
+            slots.release()
+            if isinstance(exc, BrokenProcessPool):
+                self.shutdown()
+                raise HashingBusy()
+            raise
+        # The slot is held until the pool is done with this hash, not just until we stop
+        # waiting, so PASSWORD_HASH_QUEUE bounds the work actually queued in the pool
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(self.timeout)
+        except BrokenProcessPool:
+            # A worker died (OOM, kill); start a fresh pool on the next call
+            self.shutdown()
+            raise HashingBusy()
+        except FutureTimeout:  # the builtin TimeoutError only from Python 3.11
+            future.cancel()  # drops it if it hasn't started; a running hash keeps its slot
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored, password):
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        """True when ``stored`` was made with another algorithm or cost than the configured one."""
+        return stored.split("$", 1)[0] != self.method
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher()
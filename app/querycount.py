@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Counts SQL statements per request (flask.g) and inside count_queries() blocks.
+_counters: ContextVar[tuple] = ContextVar("query_counters", default=())
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements = []
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._query_count = g.get("_query_count", 0) + 1
+    for counter in _counters.get():
+        counter.count += 1
+        counter.statements.append(statement)
+
+def request_query_count() -> int:
+    """Number of SQL statements executed so far in the current request."""
+    return g.get("_query_count", 0)
+
+@contextmanager
+def count_queries():
+    """Count statements executed inside the block: ``with count_queries() as c: ...; c.count``."""
+    counter = QueryCounter()
+    token = _counters.set(_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _counters.reset(token)
+
+def init_query_counter(app):
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config.get("QUERY_COUNT_HEADER") or app.testing:
+            response.headers["X-Query-Count"] = str(request_query_count())
+        return response
@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from flask_login import current_user
+from .utils import parse_range, revenue_report, top_products
+
+bp = Blueprint("reports", __name__)
+
+@bp.before_request
+def require_admin():
+    if not (current_user.is_authenticated and current_user.is_admin):
+        return jsonify({"error": "Forbidden"}), 403
+
+def _range():
+    return parse_range(request.args.get("start", "").strip(), request.args.get("end", "").strip())
+
+@bp.get("/revenue")
+def revenue():
+    try:
+        start, end = _range()
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    group = request.args.get("group", "day").strip()
+    if group not in ("day", "category", "total"):
+        return jsonify({"error": "group must be day, category or total"}), 400
+    return jsonify(revenue_report(start, end, group))
+
+@bp.get("/top-products")
+def top_sellers():
+    try:
+        start, end = _range()
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    limit = min(max(1, int(request.args.get("limit", 10))), 100)
+    by = "units" if request.args.get("by", "").strip() == "units" else "revenue"
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "by": by,
+        "products": top_products(start, end, limit, by),
+    })
@@ -0,0 +1,198 @@
+from datetime import date, datetime, timedelta
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Date, cast, delete, event, func, inspect, select
+from sqlalchemy.orm import Session, object_session
+from ..extensions import db
+from ..models import Category, DailySales, Order, OrderItem, Product
+
+# Orders in these statuses don't count as sales
+EXCLUDED_STATUSES = ("cancelled",)
+
+_rollup = DailySales.__table__
+_ROLLUP_COLUMNS = ["day", "product_id", "category_id", "units", "revenue", "order_count"]
+
+def is_counted(status):
+    return (status or "pending") not in EXCLUDED_STATUSES
+
+def _day_expr(conn):
+    # CAST(... AS DATE) has numeric affinity on SQLite; date() yields the ISO day string
+    if conn.dialect.name == "sqlite":
+        return func.date(Order.created_at)
+    return cast(Order.created_at, Date)
+
+def _day_param(conn, day):
+    return day.isoformat() if conn.dialect.name == "sqlite" else day
+
+def _contribution(conn, where):
+    """Per (day, product, category) aggregates of the order items matching ``where``."""
+    day = _day_expr(conn)
+    return (
+        select(
+            day.label("day"),
+            OrderItem.product_id,
+            Product.category_id,
+            func.sum(OrderItem.quantity).label("units"),
+            func.sum(OrderItem.price * OrderItem.quantity).label("revenue"),
+            func.count(func.distinct(Order.id)).label("order_count"),
+        )
+        .select_from(OrderItem)
+        .join(Order, OrderItem.order_id == Order.id)
+        .join(Product, OrderItem.product_id == Product.id)
+        .where(where)
+        .group_by(day, OrderItem.product_id, Product.category_id)
+    )
+
+def _upsert_insert(conn):
+    if conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+def apply_order(conn, order_id):
+    """Add one new order's items to the rollup in a single upsert."""
+    insert = _upsert_insert(conn)
+    if insert is None:
+        created_at = conn.execute(select(Order.created_at).where(Order.id == order_id)).scalar()
+        if created_at is not None:
+            rebuild_rollup(conn, created_at.date(), created_at.date())
+        return
+    stmt = insert(_rollup).from_select(_ROLLUP_COLUMNS, _contribution(conn, Order.id == order_id))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "product_id", "category_id"],
+        set_={
+            "units": _rollup.c.units + stmt.excluded.units,
+            "revenue": _rollup.c.revenue + stmt.excluded.revenue,
+            "order_count": _rollup.c.order_count + stmt.excluded.order_count,
+        },
+    )
+    conn.execute(stmt)
+
+def rebuild_rollup(conn, start=None, end=None):
+    """Recompute the rollup from orders, for all days or the inclusive range [start, end]."""
+    day = _day_expr(conn)
+    where = Order.status.is_(None) | Order.status.notin_(EXCLUDED_STATUSES)
+    wipe = delete(_rollup)
+    if start is not None:
+        where &= day >= _day_param(conn, start)
+        wipe = wipe.where(_rollup.c.day >= start)
+    if end is not None:
+        where &= day <= _day_param(conn, end)
+        wipe = wipe.where(_rollup.c.day <= end)
+    conn.execute(wipe)
+    result = conn.execute(_rollup.insert().from_select(_ROLLUP_COLUMNS, _contribution(conn, where)))
+    return result.rowcount
+
+# Queries served from the rollup -------------------------------------------
+
+def revenue_report(start, end, group="day"):
+    """Revenue and units in [start, end], per day, per category, or as one total."""
+    base = (db.session.query(func.sum(DailySales.revenue), func.sum(DailySales.units))
+            .filter(DailySales.day >= start, DailySales.day <= end))
+    revenue, units = base.one()
+    report = {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "revenue": float(revenue or 0),
+        "units": int(units or 0),
+    }
+    if group == "day":
+        rows = base.add_columns(DailySales.day).group_by(DailySales.day).order_by(DailySales.day).all()
+        report["days"] = [{"day": d.isoformat(), "revenue": float(r), "units": int(u)} for r, u, d in rows]
+    elif group == "category":
+        rows = (base.add_columns(Category.id, Category.name)
+                .join(Category, DailySales.category_id == Category.id)
+                .group_by(Category.id, Category.name)
+                .order_by(func.sum(DailySales.revenue).desc()).all())
+        report["categories"] = [
+            {"id": cid, "name": name, "revenue": float(r), "units": int(u)} for r, u, cid, name in rows
+        ]
+    return report
+
+def top_products(start, end, limit=10, by="revenue"):
+    metric = func.sum(DailySales.units) if by == "units" else func.sum(DailySales.revenue)
+    rows = (db.session.query(
+                Product.id, Product.name, Product.slug,
+                func.sum(DailySales.units), func.sum(DailySales.revenue), func.sum(DailySales.order_count))
+            .join(Product, DailySales.product_id == Product.id)
+            .filter(DailySales.day >= start, DailySales.day <= end)
+            .group_by(Product.id, Product.name, Product.slug)
+            .order_by(metric.desc()).limit(limit).all())
+    return [
+        {"id": pid, "name": name, "slug": slug, "units": int(units), "revenue": float(revenue), "orders": int(orders)}
+        for pid, name, slug, units, revenue, orders in rows
+    ]
+
+def parse_range(start, end, default_days=30):
+    """Parse ISO dates (inclusive); defaults to the last ``default_days`` days."""
+    end = date.fromisoformat(end) if end else datetime.utcnow().date()
+    start = date.fromisoformat(start) if start else end - timedelta(days=default_days - 1)
+    return start, end
+
+# Incremental maintenance for edits made through the ORM (admin, scripts).
+# Checkout calls apply_order() itself since it bulk-inserts its items.
+_ORDERS = "daily_sales_orders"
+_DAYS = "daily_sales_days"
+
+def _queue(target, key, value):
+    object_session(target).info.setdefault(key, set()).add(value)
+
+@event.listens_for(Order, "after_update")
+def _order_updated(mapper, connection, target):
+    attrs = inspect(target).attrs
+    created = attrs.created_at.history
+    if created.has_changes():
+        for ts in list(created.deleted) + list(created.added):
+            if ts is not None:
+                _queue(target, _DAYS, ts.date())
+        return
+    status = attrs.status.history
+    if status.has_changes() and target.created_at is not None:
+        # Rebuild the day instead of subtracting: the rows this order added are keyed on its
+        # products' categories at checkout, which may have changed since. An expired order
+        # has no old status to compare, so it is rebuilt too.
+        if not status.deleted or is_counted(status.deleted[0]) != is_counted(target.status):
+            _queue(target, _DAYS, target.created_at.date())
+
+@event.listens_for(Order, "after_delete")
+def _order_deleted(mapper, connection, target):
+    if target.created_at is not None:
+        _queue(target, _DAYS, target.created_at.date())
+
+def _item_changed(mapper, connection, target):
+    _queue(target, _ORDERS, target.order_id)
+    for oid in inspect(target).attrs.order_id.history.deleted:
+        if oid:
+            _queue(target, _ORDERS, oid)
+
+for _evt in ("after_insert", "after_update", "after_delete"):
+    event.listen(OrderItem, _evt, _item_changed)
+
+@event.listens_for(Session, "after_flush_postexec")
+def _maintain_rollup(session, flush_context):
+    order_ids = session.info.pop(_ORDERS, set())
+    days = session.info.pop(_DAYS, set())
+    if not (order_ids or days):
+        return
+    conn = session.connection()
+    if order_ids:
+        stamps = conn.execute(select(Order.created_at).where(Order.id.in_(order_ids))).scalars()
+        days.update(ts.date() for ts in stamps if ts is not None)
+    for day in days:
+        rebuild_rollup(conn, day, day)
+
+reports_cli = AppGroup("reports", help="Sales reporting commands.")
+
+@reports_cli.command("rebuild")
+@click.option("--start", help="First day (YYYY-MM-DD); default all.")
+@click.option("--end", help="Last day (YYYY-MM-DD); default all.")
+def rebuild_command(start, end):
+    """Rebuild the daily_sales rollup from orders."""
+    start = date.fromisoformat(start) if start else None
+    end = date.fromisoformat(end) if end else None
+    with db.engine.begin() as conn:
+        rows = rebuild_rollup(conn, start, end)
+    click.echo(f"Wrote {rows} daily_sales rows.")
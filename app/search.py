@@ -0,0 +1,113 @@
+import re
+import click
+from flask.cli import AppGroup
+from sqlalchemy import DDL, bindparam, event, inspect, or_, table, column, literal_column, text
+from .extensions import db
+from .models import Product
+
+# SQLite FTS5 index over Product.name / Product.description.
+# rowid of the virtual table is the product id, so matches join straight back to product.
+FTS_TABLE = "product_fts"
+
+product_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+CREATE_FTS_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+)
+
+event.listen(Product.__table__, "after_create", DDL(CREATE_FTS_SQL).execute_if(dialect="sqlite"))
+event.listen(Product.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+def fts_enabled(bind=None):
+    bind = bind if bind is not None else db.engine
+    return bind.dialect.name == "sqlite"
+
+def match_expression(q: str):
+    """Turn free text into an FTS5 query: every word must match, each as a prefix."""
+    tokens = _TOKEN_RE.findall(q.lower())
+    return " ".join(f'"{tok}"*' for tok in tokens)
+
+def apply_search(query, q: str):
+    """Restrict ``query`` (over Product) to rows matching ``q``.
+
+    Returns ``(query, rank_order)``; ``rank_order`` is an ORDER BY clause for
+    best-match-first, or None when the ILIKE fallback was used.
+    """
+    expr = match_expression(q)
+    if expr and fts_enabled():
+        query = query.join(product_fts, product_fts.c.rowid == Product.id).filter(
+            literal_column(FTS_TABLE).op("MATCH")(expr)
+        )
+        return query, product_fts.c.rank.asc()
+    like = f"%{q}%"
+    return query.filter(or_(Product.name.ilike(like), Product.description.ilike(like))), None
+
+# Keep the index in sync with ORM writes
+def _index_row(connection, target):
+    connection.execute(
+        text(f"INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (:id, :name, :description)"),
+        {"id": target.id, "name": target.name or "", "description": target.description or ""},
+    )
+
+def _unindex_row(connection, product_id):
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": product_id})
+
+@event.listens_for(Product, "after_insert")
+def fts_after_insert(mapper, connection, target):
+    if fts_enabled(connection):
+        _index_row(connection, target)
+
+@event.listens_for(Product, "after_update")
+def fts_after_update(mapper, connection, target):
+    if not fts_enabled(connection):
+        return
+    state = inspect(target)
+    if state.attrs.name.history.has_changes() or state.attrs.description.history.has_changes():
+        _unindex_row(connection, target.id)
+        _index_row(connection, target)
+
+@event.listens_for(Product, "after_delete")
+def fts_after_delete(mapper, connection, target):
+    if fts_enabled(connection):
+        _unindex_row(connection, target.id)
+
+def reindex_products(connection, product_ids):
+    """Refresh index rows for ``product_ids``; for bulk writes that bypass the mapper events."""
+    if not fts_enabled(connection):
+        return
+    ids = list(product_ids)
+    for i in range(0, len(ids), 500):
+        batch = {"ids": ids[i:i + 500]}
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(_expanding_ids()), batch)
+        connection.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+            "SELECT id, name, COALESCE(description, '') FROM product WHERE id IN :ids"
+        ).bindparams(_expanding_ids()), batch)
+
+def _expanding_ids():
+    return bindparam("ids", expanding=True)
+
+def rebuild_index():
+    """Repopulate the index from the product table; returns the number of rows indexed."""
+    with db.engine.begin() as conn:
+        conn.execute(text(CREATE_FTS_SQL))
+        conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        conn.execute(text(
+            f"INSERT INTO {FTS_TABLE}(rowid, name, description) "
+            "SELECT id, name, COALESCE(description, '') FROM product"
+        ))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"))
+        return conn.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+
+search_cli = AppGroup("search", help="Product search index commands.")
+
+@search_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the product full-text index."""
+    if not fts_enabled():
+        raise click.ClickException("Full-text index requires SQLite (FTS5).")
+    count = rebuild_index()
+    click.echo(f"Indexed {count} products.")
@@ -0,0 +1,185 @@
+import os
+import re
+import tempfile
+import time
+import click
+from flask.cli import AppGroup
+from slugify import slugify
+from sqlalchemy import and_, event, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+# Bases are looked up this many at a time (keeps the OR chain under SQLite's expression depth limit)
+PRIME_BATCH = 200
+
+class SlugAllocator:
+    """Hands out unique slugs for ``model`` without probing one candidate per query.
+
+    For each base it loads every taken ``base`` / ``base-N`` slug with one indexed range
+    scan (``slug >= 'base-' AND slug < 'base.'``), then serves ``base``, ``base-2``, ...
+    from an in-memory counter. Allocations are remembered, so two new rows in the same
+    batch never get the same slug.
+    """
+
+    def __init__(self, session, model):
+        self.session = session
+        self.model = model
+        self._next = {}  # base -> next free suffix (1 means the bare base is free)
+        self._issued = set()  # slugs handed out, so "shirt-3" from "Shirt" and "Shirt 3" can't clash
+
+    @staticmethod
+    def base_for(text):
+        return slugify(text or "") or "item"
+
+    def _range(self, base):
+        column = self.model.slug
+        return or_(column == base, and_(column >= f"{base}-", column < f"{base}."))
+
+    def prime(self, texts):
+        """Load taken slugs for all unseen bases of ``texts`` in as few queries as possible."""
+        self._prime_bases({self.base_for(t) for t in texts})
+
+    def _prime_bases(self, bases):
+        bases = sorted(set(bases) - self._next.keys())
+        for i in range(0, len(bases), PRIME_BATCH):
+            batch = bases[i:i + PRIME_BATCH]
+            highest = {base: 0 for base in batch}
+            with self.session.no_autoflush:
+                taken = self.session.execute(
+                    select(self.model.slug).where(or_(*(self._range(b) for b in batch)))
+                ).scalars()
+                for slug in taken:
+                    self._record(highest, slug)
+            for base, top in highest.items():
+                self._next[base] = top + 1
+
+    @staticmethod
+    def _record(highest, slug):
+        if slug in highest:
+            highest[slug] = max(highest[slug], 1)
+            return
+        base, _, suffix = slug.rpartition("-")
+        if base in highest and suffix.isdigit():
+            highest[base] = max(highest[base], int(suffix))
+
+    def allocate(self, text):
+        base = self.base_for(text)
+        if base not in self._next:
+            self.prime([text])
+        n = self._next[base]
+        slug = base if n == 1 else f"{base}-{n}"
+        while slug in self._issued:
+            n += 1
+            slug = f"{base}-{n}"
+        self._next[base] = n + 1
+        self._issued.add(slug)
+        return slug
+
+    def reserve(self, slug):
+        """Mark an explicitly chosen slug as taken so later allocations skip it."""
+        m = re.fullmatch(r"(.+)-(\d+)", slug)
+        claims = [(slug, 1)] + ([(m.group(1), int(m.group(2)))] if m else [])
+        for base, n in claims:
+            # Unprimed bases pick this up from _issued (or the table) when first allocated
+            if self._next.get(base, n + 1) <= n:
+                self._next[base] = n + 1
+        self._issued.add(slug)
+
+    def reset(self):
+        self._next.clear()
+        self._issued.clear()
+
+# Per-session allocators: suffix counters survive commits within a session (a request, a CLI run)
+# and are dropped on rollback. Anything another process took meanwhile surfaces as an
+# IntegrityError, which add_with_unique_slug() retries with fresh counters.
+_ALLOCATORS = "slug_allocators"
+_AUTO_SLUG_MODELS = {}  # model -> attribute the slug is derived from
+
+def slug_allocator(session, model):
+    allocators = session.info.setdefault(_ALLOCATORS, {})
+    if model not in allocators:
+        allocators[model] = SlugAllocator(session, model)
+    return allocators[model]
+
+def reset_slug_allocators(session):
+    session.info.pop(_ALLOCATORS, None)
+
+def auto_slug(model, source="name"):
+    """Fill ``model.slug`` from ``source`` on insert when it was left empty."""
+    _AUTO_SLUG_MODELS[model] = source
+
+    @event.listens_for(model, "before_insert")
+    def _assign_slug(mapper, connection, target):
+        allocator = slug_allocator(object_session(target), model)
+        if target.slug:
+            allocator.reserve(target.slug)
+        else:
+            target.slug = allocator.allocate(getattr(target, source))
+
+@event.listens_for(Session, "before_flush")
+def _prime_pending(session, flush_context, instances):
+    # One range query per model for everything about to be inserted, not one per row
+    pending = {}
+    for obj in session.new:
+        source = _AUTO_SLUG_MODELS.get(type(obj))
+        if source and not obj.slug:
+            pending.setdefault(type(obj), []).append(getattr(obj, source))
+    for model, texts in pending.items():
+        slug_allocator(session, model).prime(texts)
+
+@event.listens_for(Session, "after_rollback")
+def _reset_after_rollback(session):
+    reset_slug_allocators(session)
+
+def is_slug_conflict(exc):
+    return "slug" in str(exc.orig)
+
+def add_with_unique_slug(session, obj, attempts=3):
+    """Add and flush ``obj`` in a savepoint, re-allocating its slug if another writer took it."""
+    auto = not obj.slug
+    for attempt in range(attempts):
+        try:
+            with session.begin_nested():
+                session.add(obj)
+            return obj
+        except IntegrityError as exc:
+            if not (auto and is_slug_conflict(exc)) or attempt == attempts - 1:
+                raise
+            reset_slug_allocators(session)
+            obj.slug = None
+
+slugs_cli = AppGroup("slugs", help="Slug allocation commands.")
+
+@slugs_cli.command("bench")
+@click.option("--count", default=10000, show_default=True, help="Products to insert, all with the same name.")
+@click.option("--batch", default=500, show_default=True, help="Products per flush/commit.")
+def bench_command(count, batch):
+    """Insert COUNT same-name products into a throwaway SQLite DB and time slug allocation."""
+    from . import create_app
+    from .extensions import db
+    from .models import Category, Product
+    from .querycount import count_queries
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'slugs.db')}"})
+        with app.app_context():
+            db.create_all()
+            category = Category(name="Bench")
+            db.session.add(category)
+            db.session.commit()
+            started = time.perf_counter()
+            with count_queries() as counter:
+                for i in range(0, count, batch):
+                    db.session.add_all(
+                        Product(name="T-Shirt", price=10, category_id=category.id)
+                        for _ in range(min(batch, count - i))
+                    )
+                    db.session.commit()
+            elapsed = time.perf_counter() - started
+            slug_queries = sum(1 for sql in counter.statements if sql.lstrip().upper().startswith("SELECT"))
+            last = db.session.scalar(select(Product.slug).order_by(Product.id.desc()).limit(1))
+            distinct = db.session.scalar(select(db.func.count(db.func.distinct(Product.slug))))
+            db.engine.dispose()
+
+    click.echo(f"{count} inserts in {elapsed:.2f}s ({count / elapsed:.0f}/s), "
+               f"{slug_queries} SELECTs, {distinct} distinct slugs, last={last}")
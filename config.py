@@ -5,4 +5,86 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, 'app.db')}")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    ITEMS_PER_PAGE = int(os.environ.get("ITEMS_PER_PAGE", "12"))
\ No newline at end of file
+    ITEMS_PER_PAGE = int(os.environ.get("ITEMS_PER_PAGE", "12"))
+    # Relationship loading for product listings: "selectin", "joined" or "lazy"
+    PRODUCT_IMAGES_LOADER = os.environ.get("PRODUCT_IMAGES_LOADER", "selectin")
+    PRODUCT_CATEGORY_LOADER = os.environ.get("PRODUCT_CATEGORY_LOADER", "joined")
+    # Adds an X-Query-Count header to every response (always on when TESTING)
+    QUERY_COUNT_HEADER = os.environ.get("QUERY_COUNT_HEADER", "0") == "1"
+    # Response cache: "lru" (per process), "redis", "fakeredis" (in-memory Redis stand-in) or "null"
+    RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "1") == "1"
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "lru")
+    CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_DEFAULT_TTL = int(os.environ.get("CACHE_DEFAULT_TTL", "60"))
+    CACHE_MAXSIZE = int(os.environ.get("CACHE_MAXSIZE", "1024"))
+    # Cache-Control sent with ETag/Last-Modified validated responses
+    API_CACHE_CONTROL = os.environ.get("API_CACHE_CONTROL", "public, max-age=30")
+    PAGE_CACHE_CONTROL = os.environ.get("PAGE_CACHE_CONTROL", "no-cache")
+    # Checkout retries on database lock contention (exponential backoff, seconds)
+    CHECKOUT_MAX_RETRIES = int(os.environ.get("CHECKOUT_MAX_RETRIES", "5"))
+    CHECKOUT_RETRY_BACKOFF = float(os.environ.get("CHECKOUT_RETRY_BACKOFF", "0.05"))
+    # Products per yield_per batch (and per streamed chunk) in /api/products/feed
+    FEED_BATCH_SIZE = int(os.environ.get("FEED_BATCH_SIZE", "500"))
+    # JSON provider: "auto" (orjson when installed), "orjson" or "stdlib"
+    JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "auto")
+    # Upper edges of the price facet buckets on the product listings
+    FACET_PRICE_BUCKETS = os.environ.get("FACET_PRICE_BUCKETS", "25,50,100,250,500")
+    # Request instrumentation: Server-Timing, slow-query log, /metrics, per-request cProfile
+    INSTRUMENTATION_ENABLED = os.environ.get("INSTRUMENTATION_ENABLED", "0") == "1"
+    SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", "200"))
+    # Bearer token for /metrics; without one the endpoint answers 404
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+    PROFILE_HEADER = os.environ.get("PROFILE_HEADER", "X-Profile")
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+    # Engine pool (server databases also get pre-ping and recycle)
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+    # SQLite connection pragmas
+    SQLITE_WAL = os.environ.get("SQLITE_WAL", "1") == "1"
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    # Read replica for catalog/API reads (e.g. sqlite:///replica.db, kept fresh with `flask replica sync`)
+    DATABASE_REPLICA_URL = os.environ.get("DATABASE_REPLICA_URL", "")
+    # Background jobs (`flask worker`): threads per worker, idle poll, retries and claim lease
+    JOBS_WORKER_THREADS = int(os.environ.get("JOBS_WORKER_THREADS", "4"))
+    JOBS_POLL_INTERVAL = float(os.environ.get("JOBS_POLL_INTERVAL", "1.0"))
+    JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "5"))
+    JOBS_RETRY_BACKOFF = float(os.environ.get("JOBS_RETRY_BACKOFF", "10"))
+    JOBS_LEASE_SECONDS = int(os.environ.get("JOBS_LEASE_SECONDS", "300"))
+    # Order confirmation emails; logged instead of sent when MAIL_SERVER is empty
+    MAIL_SERVER = os.environ.get("MAIL_SERVER", "")
+    MAIL_PORT = int(os.environ.get("MAIL_PORT", "25"))
+    MAIL_SENDER = os.environ.get("MAIL_SENDER", "shop@localhost")
+    # Per-process cache of logged-in users for the login manager (0 disables)
+    IDENTITY_CACHE_SIZE = int(os.environ.get("IDENTITY_CACHE_SIZE", "1024"))
+    IDENTITY_CACHE_TTL = int(os.environ.get("IDENTITY_CACHE_TTL", "60"))
+    # Password hashing: Werkzeug method with its cost ("scrypt:n:r:p" or "pbkdf2:sha256:iterations");
+    # older hashes are upgraded on login. Hashes run in a process pool (0 workers = inline)
+    # and callers beyond WORKERS + QUEUE get a 503
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.environ.get("PASSWORD_HASH_QUEUE", "16"))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", "10"))
+    # Product image variants (needs Pillow): widths, formats and quality of the resized
+    # copies written under static/IMAGE_VARIANT_DIR by the image_variants job
+    IMAGE_VARIANT_WIDTHS = os.environ.get("IMAGE_VARIANT_WIDTHS", "160,320,640,1280")
+    IMAGE_VARIANT_FORMATS = os.environ.get("IMAGE_VARIANT_FORMATS", "webp,jpeg")
+    IMAGE_VARIANT_QUALITY = int(os.environ.get("IMAGE_VARIANT_QUALITY", "80"))
+    IMAGE_VARIANT_DIR = os.environ.get("IMAGE_VARIANT_DIR", "variants")
+    # Remote (http/https) image_url sources are fetched only when enabled, and only from
+    # these comma-separated hosts (redirects included): image_url arrives through admin
+    # forms and bulk imports, so an open fetch would let the worker reach internal addresses
+    IMAGE_FETCH_REMOTE = os.environ.get("IMAGE_FETCH_REMOTE", "0") == "1"
+    IMAGE_REMOTE_HOSTS = os.environ.get("IMAGE_REMOTE_HOSTS", "")
+    IMAGE_MAX_SOURCE_BYTES = int(os.environ.get("IMAGE_MAX_SOURCE_BYTES", str(20 * 2**20)))
+    # {% cache %} template fragments: per-process LRU entries, keyed on what they render
+    FRAGMENT_CACHE_ENABLED = os.environ.get("FRAGMENT_CACHE_ENABLED", "1") == "1"
+    FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "4096"))
+    FRAGMENT_CACHE_TTL = int(os.environ.get("FRAGMENT_CACHE_TTL", "300"))
+    # Longest a worker keeps its category tree when writes elsewhere cannot bump its version
+    CATEGORY_TREE_MAX_AGE = int(os.environ.get("CATEGORY_TREE_MAX_AGE", "60"))
+    # Longest a worker keeps its facet index when commits elsewhere cannot bump its generation
+    FACET_INDEX_MAX_AGE = int(os.environ.get("FACET_INDEX_MAX_AGE", "30"))
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""product full-text search index
+
+Revision ID: 3c1d5e7a9b20
+Revises: 9f8a83cf6b4b
+Create Date: 2026-10-18 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1d5e7a9b20'
+down_revision = '9f8a83cf6b4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts "
+        "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "INSERT INTO product_fts(rowid, name, description) "
+        "SELECT id, name, COALESCE(description, '') FROM product"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TABLE IF EXISTS product_fts")
@@ -0,0 +1,52 @@
+"""listing indexes
+
+Revision ID: 5a7e2c4f8d13
+Revises: 3c1d5e7a9b20
+Create Date: 2026-10-18 10:02:15.540731
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7e2c4f8d13'
+down_revision = '3c1d5e7a9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_active_category_price', ['is_active', 'category_id', 'price'], unique=False)
+        batch_op.create_index('ix_product_active_created', ['is_active', 'created_at'], unique=False)
+        batch_op.create_index('ix_product_active_price', ['is_active', 'price'], unique=False)
+        batch_op.create_index('ix_product_active_name', ['is_active', 'name'], unique=False)
+        batch_op.create_index('ix_product_active_featured_created', ['is_active', 'featured', 'created_at'], unique=False)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_item_order_id'), ['order_id'], unique=False)
+
+    with op.batch_alter_table('product_image', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_product_image_product_id'), ['product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_image', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_image_product_id'))
+
+    with op.batch_alter_table('order_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_item_order_id'))
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_user_id'))
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_active_featured_created')
+        batch_op.drop_index('ix_product_active_name')
+        batch_op.drop_index('ix_product_active_price')
+        batch_op.drop_index('ix_product_active_created')
+        batch_op.drop_index('ix_product_active_category_price')
@@ -0,0 +1,35 @@
+"""category and product_image updated_at
+
+Revision ID: 7b3f9d1e2a64
+Revises: 5a7e2c4f8d13
+Create Date: 2026-10-18 11:20:07.903318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b3f9d1e2a64'
+down_revision = '5a7e2c4f8d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('product_image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE category SET updated_at = CURRENT_TIMESTAMP")
+    op.execute("UPDATE product_image SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table('product_image', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('category', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
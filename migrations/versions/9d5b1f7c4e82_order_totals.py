@@ -0,0 +1,38 @@
+"""denormalized order totals
+
+Revision ID: 9d5b1f7c4e82
+Revises: 8c4a0e6b3f57
+Create Date: 2026-10-18 14:05:33.612947
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d5b1f7c4e82'
+down_revision = '8c4a0e6b3f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('total', sa.Numeric(precision=10, scale=2), nullable=False, server_default='0'))
+
+    # Backfill from existing items
+    op.execute(
+        'UPDATE "order" SET '
+        'subtotal = (SELECT COALESCE(SUM(price * quantity), 0) FROM order_item WHERE order_item.order_id = "order".id), '
+        'item_count = (SELECT COALESCE(SUM(quantity), 0) FROM order_item WHERE order_item.order_id = "order".id), '
+        'total = (SELECT COALESCE(SUM(price * quantity), 0) FROM order_item WHERE order_item.order_id = "order".id)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_column('total')
+        batch_op.drop_column('item_count')
+        batch_op.drop_column('subtotal')
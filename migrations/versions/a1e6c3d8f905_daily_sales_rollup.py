@@ -0,0 +1,60 @@
+"""daily sales rollup
+
+Revision ID: a1e6c3d8f905
+Revises: 9d5b1f7c4e82
+Create Date: 2026-10-18 15:31:48.270116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1e6c3d8f905'
+down_revision = '9d5b1f7c4e82'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_sales',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['category.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'product_id', 'category_id', name='uq_daily_sales_key')
+    )
+    with op.batch_alter_table('daily_sales', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_daily_sales_day'), ['day'], unique=False)
+        batch_op.create_index(batch_op.f('ix_daily_sales_product_id'), ['product_id'], unique=False)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_created_at'), ['created_at'], unique=False)
+
+    # Initial fill; afterwards `flask reports rebuild` does the same
+    day = "date(o.created_at)" if op.get_bind().dialect.name == 'sqlite' else "CAST(o.created_at AS DATE)"
+    op.execute(
+        "INSERT INTO daily_sales (day, product_id, category_id, units, revenue, order_count) "
+        f"SELECT {day}, oi.product_id, p.category_id, SUM(oi.quantity), "
+        "SUM(oi.price * oi.quantity), COUNT(DISTINCT o.id) "
+        'FROM order_item oi JOIN "order" o ON oi.order_id = o.id JOIN product p ON oi.product_id = p.id '
+        "WHERE o.status IS NULL OR o.status != 'cancelled' "
+        f"GROUP BY {day}, oi.product_id, p.category_id"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_created_at'))
+
+    with op.batch_alter_table('daily_sales', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_daily_sales_product_id'))
+        batch_op.drop_index(batch_op.f('ix_daily_sales_day'))
+
+    op.drop_table('daily_sales')
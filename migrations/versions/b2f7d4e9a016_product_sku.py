@@ -0,0 +1,28 @@
+"""product sku
+
+Revision ID: b2f7d4e9a016
+Revises: a1e6c3d8f905
+Create Date: 2026-10-18 16:12:05.448213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2f7d4e9a016'
+down_revision = 'a1e6c3d8f905'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sku', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_product_sku'), ['sku'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_sku'))
+        batch_op.drop_column('sku')
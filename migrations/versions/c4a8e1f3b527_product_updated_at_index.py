@@ -0,0 +1,26 @@
+"""product updated_at index
+
+Revision ID: c4a8e1f3b527
+Revises: b2f7d4e9a016
+Create Date: 2026-10-18 16:48:21.903114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8e1f3b527'
+down_revision = 'b2f7d4e9a016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_product_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_updated_at'))